@@ -344,6 +344,9 @@ def run_tui(
                         id="filter_help",
                     ),
                     Input(value=iv(self.current.uuid), placeholder="uuid", id="uuid"),
+                    Input(value=iv(self.current.subsystem), placeholder="subsystem", id="subsystem"),
+                    Input(value=iv(self.current.text), placeholder="text in message / data (full-text index)", id="text"),
+                    Input(value=",".join(self.current.fields or []), placeholder="fields (comma list), e.g. data.shot=1234", id="fields"),
                     Input(value=iv(self.current.l_type), placeholder="type (l_type), e.g. EXP", id="l_type"),
                     Input(value=iv(self.current.level), placeholder="level (exact)", id="level"),
                     Input(value=iv(self.current.min_level), placeholder="min-level", id="min_level"),
@@ -376,6 +379,10 @@ def run_tui(
 
         def action_apply(self) -> None:
             uuid = self.query_one("#uuid", Input).value.strip() or None
+            subsystem = self.query_one("#subsystem", Input).value.strip() or None
+            text = self.query_one("#text", Input).value.strip() or None
+            fields_raw = self.query_one("#fields", Input).value.strip()
+            fields = [x.strip() for x in fields_raw.split(",") if x.strip()] if fields_raw else None
             l_type = self.query_one("#l_type", Input).value.strip() or None
             level = self.query_one("#level", Input).value.strip() or None
             min_level = self.query_one("#min_level", Input).value.strip() or None
@@ -391,6 +398,9 @@ def run_tui(
                 **{
                     **asdict(self.current),
                     "uuid": uuid,
+                    "subsystem": subsystem,
+                    "text": text,
+                    "fields": fields,
                     "l_type": l_type,
                     "level": level,
                     "min_level": min_level,
@@ -636,7 +646,7 @@ def run_tui(
 
             uuid_flag = self.opts.uuid if self.opts.uuid else "-"
             self.query_one("#topbar", Static).update(
-                f"archive={self.archive}  [{' '.join(flags)}]  uuid={uuid_flag}  type={self.opts.l_type or '-'}  "
+                f"archive={self.archive}  [{' '.join(flags)}]  uuid={uuid_flag}  subsystem={self.opts.subsystem or '-'}  text={self.opts.text or '-'}  fields={','.join(self.opts.fields or []) or '-'}  type={self.opts.l_type or '-'}  "
                 f"level={self.opts.level or '-'}  min={self.opts.min_level or '-'}  exclude=[{ex}]"
             )
 
@@ -962,8 +972,15 @@ def run_tui(
                 self.opts = ro
                 if self.opts.exclude_types is None and self.opts.l_type is None:
                     self.opts.exclude_types = ["REC"]
+                try:
+                    self._jump_end()
+                except ValueError as e:
+                    # Text / field filter the archive has no index for, or malformed.
+                    self.notify(str(e), severity="error")
+                    self.opts.text = None
+                    self.opts.fields = None
+                    self._jump_end()
                 save_state(archive=self.archive, opts=self.opts)
-                self._jump_end()
                 self._render()
 
             self.push_screen(FilterScreen(self.opts), callback=_cb)
@@ -135,6 +135,13 @@ def cmd_logger(args: argparse.Namespace) -> int:
         (args.host, args.port),
         resolve_log_dir(args.log_dir, env_var=ENV_LOG_DIR),
         rotate_max_bytes=args.rotate_max_mb * 1024 * 1024,
+        pipelined=not args.no_pipeline,
+        durability=args.durability,
+        shards=args.shards,
+        compress=args.compress,
+        sparse_index=args.sparse_index,
+        full_text=args.full_text,
+        index_fields=args.index_fields,
     )
     return 0
 
@@ -159,6 +166,9 @@ def cmd_log_query(args: argparse.Namespace) -> int:
     view = viewer.open_archive(args.archive)
     opts = QueryOptions(
         uuid=args.uuid,
+        subsystem=args.subsystem,
+        text=args.grep,
+        fields=args.fields,
         line_from=args.line_from,
         line_to=args.line_to,
         since=args.since,
@@ -176,7 +186,13 @@ def cmd_log_query(args: argparse.Namespace) -> int:
     hide_uuids = getattr(args, 'never_show_uuids', False)
 
 
-    for ln in view.query(opts):
+    try:
+        lines = view.query(opts)
+    except ValueError as e:
+        # Text / field filter the archive has no index for, or malformed.
+        raise SystemExit(str(e))
+
+    for ln in lines:
         print_log_line_rich(ln, show_uuids=show_uuids, hide_uuids=hide_uuids) if use_color else print(format_line(ln))
     return 0
 
@@ -185,6 +201,9 @@ def cmd_log_follow(args: argparse.Namespace) -> int:
     view = viewer.open_archive(args.archive)
     opts = QueryOptions(
         uuid=args.uuid,
+        subsystem=args.subsystem,
+        text=args.grep,
+        fields=args.fields,
         line_from=args.line_from,
         line_to=args.line_to,
         since=args.since,
@@ -199,8 +218,11 @@ def cmd_log_follow(args: argparse.Namespace) -> int:
     hide_uuids = getattr(args, 'never_show_uuids', False)
 
 
-    for ln in view.follow(opts, tail=args.tail, batch=args.batch, poll=args.poll):
-        print_log_line_rich(ln, show_uuids=show_uuids, hide_uuids=hide_uuids) if use_color else print(format_line(ln))
+    try:
+        for ln in view.follow(opts, tail=args.tail, batch=args.batch, poll=args.poll):
+            print_log_line_rich(ln, show_uuids=show_uuids, hide_uuids=hide_uuids) if use_color else print(format_line(ln))
+    except ValueError as e:
+        raise SystemExit(str(e))
     return 0
 
 def cmd_log_browse(args: argparse.Namespace) -> int:
@@ -231,6 +253,9 @@ def cmd_log_browse(args: argparse.Namespace) -> int:
 
     base = QueryOptions(
         uuid=args.uuid,
+        subsystem=args.subsystem,
+        text=args.grep,
+        fields=args.fields,
         line_from=args.line_from,
         line_to=args.line_to,
         since=args.since,
@@ -360,7 +385,10 @@ def cmd_log_browse(args: argparse.Namespace) -> int:
         return res[0].line if res else None
 
     # Initial view: last page within the filtered range.
-    jump_end()
+    try:
+        jump_end()
+    except ValueError as e:
+        raise SystemExit(str(e))
     render()
 
     control = FormattedTextControl(text=lambda: FormattedText(fragments), focusable=False, show_cursor=False)
@@ -457,6 +485,9 @@ def cmd_log_tui(args: argparse.Namespace) -> int:
 
     opts = QueryOptions(
         uuid=args.uuid,
+        subsystem=args.subsystem,
+        text=args.grep,
+        fields=args.fields,
         line_from=args.line_from,
         line_to=args.line_to,
         since=args.since,
@@ -504,6 +535,52 @@ def cmd_log_archives(args: argparse.Namespace) -> int:
 
     return 0
 
+def cmd_log_stats(args: argparse.Namespace) -> int:
+    viewer = LogViewer(args.log_dir, env_var=ENV_LOG_DIR)
+    view = viewer.open_archive(args.archive)
+    opts = QueryOptions(
+        uuid=args.uuid,
+        subsystem=args.subsystem,
+        since=args.since,
+        until=args.until,
+        l_type=args.l_type,
+        exclude_types=_default_exclude_types(args),
+        level=args.level,
+        min_level=args.min_level,
+    )
+    try:
+        bins = view.histogram(opts, bucket=args.bucket, by=args.by or ["level"])
+    except ValueError as e:
+        raise SystemExit(str(e))
+    if not bins:
+        print("(no records)")
+        return 0
+
+    cells = [[f"{k}={'-' if v is None else v}" for k, v in b.key.items()] for b in bins]
+    widths = [max(len(c[i]) for c in cells) for i in range(len(cells[0]))]
+    peak = max(b.count for b in bins)
+    for b, row in zip(bins, cells):
+        key = "  ".join(c.ljust(w) for c, w in zip(row, widths))
+        bar = "#" * max(1, round(40 * b.count / peak))
+        print(f"{fmt_ns_local(b.start_ns)[:16]}  {key}  {b.count:>9}  {bar}")
+    return 0
+
+def cmd_log_compress(args: argparse.Namespace) -> int:
+    from ipi_ecs.logging.compression import compress_archive
+    from ipi_ecs.logging.index import archive_index_dirs
+
+    archive_dir = _resolve_archive_dir(args.log_dir, args.archive)
+    if not (archive_dir / "index.sqlite3").exists():
+        raise SystemExit(f"index.sqlite3 not found in archive dir: {archive_dir}")
+
+    total = 0
+    for d in archive_index_dirs(archive_dir):
+        for name in compress_archive(d, args.codec, include_last=args.include_last):
+            print(f"Compressed {d / name}")
+            total += 1
+    print(f"{total} segment(s) compressed.")
+    return 0
+
 def cmd_log_locate(args: argparse.Namespace) -> int:
     viewer = LogViewer(args.log_dir, env_var=ENV_LOG_DIR)
     info = viewer.locate_line(int(args.line))
@@ -650,6 +727,11 @@ def add_log_dir_arg(p: argparse.ArgumentParser, *, help_text: str = "Log directo
 
 def add_log_filters(p: argparse.ArgumentParser) -> None:
     p.add_argument("--uuid", default=None, help="Filter by originator UUID.")
+    p.add_argument("--subsystem", default=None, help="Filter by subsystem (data.subsystem).")
+    p.add_argument("--grep", default=None,
+                   help="Only records whose message or data strings contain this text (needs logger --full-text).")
+    p.add_argument("--field", dest="fields", action="append", default=None, metavar="EXPR",
+                   help="Filter on an indexed JSON path, e.g. data.shot=1234 or data.shot>=1000 (repeatable).")
 
     # line filters (inclusive in CLI)
     p.add_argument("--from", dest="line_from", type=int, default=None, help="Inclusive start global line number.")
@@ -695,6 +777,20 @@ def build_parser() -> argparse.ArgumentParser:
     pl.add_argument("--port", type=int, default=None)
     pl.add_argument("--log-dir", "--log_dir", dest="log_dir", type=Path, default=None)
     pl.add_argument("--rotate-max-mb", type=int, default=256)
+    pl.add_argument("--no-pipeline", dest="no_pipeline", action="store_true",
+                    help="Decode, write and index on the server thread instead of separate pipeline stages.")
+    pl.add_argument("--durability", choices=["none", "batch", "strict"], default="batch",
+                    help="none: OS buffering only, batch: fsync segments at each index commit, strict: fsync + commit per write.")
+    pl.add_argument("--shards", type=int, default=1,
+                    help="Number of ingest worker processes, each writing its own sub-journal (default: 1).")
+    pl.add_argument("--compress", choices=["zlib", "lzma"], default=None,
+                    help="Recompress sealed segments into seekable compressed blocks in the background.")
+    pl.add_argument("--sparse-index", dest="sparse_index", action="store_true",
+                    help="Keep record offsets only in the per-segment .idx sidecars (smaller index).")
+    pl.add_argument("--full-text", dest="full_text", action="store_true",
+                    help="Keep a full-text index of messages and data strings (log query --grep).")
+    pl.add_argument("--index-field", dest="index_fields", action="append", default=None, metavar="PATH",
+                    help="JSON path to index for log query --field, e.g. data.shot (repeatable; default: keep the archive's).")
     pl.set_defaults(fn=cmd_logger)
 
     # log tools
@@ -805,6 +901,31 @@ def build_parser() -> argparse.ArgumentParser:
     pls.add_argument("--until", default=None, help="Only show archives overlapping end time (human string).")
     pls.set_defaults(fn=cmd_log_archives)
 
+    pst = sub_log.add_parser("stats", help="Record counts per time bucket, from the index's per-minute rollups.")
+    add_archive_arg(pst)
+    add_log_dir_arg(pst)
+    pst.add_argument("--bucket", default="1m", help="Bucket width in whole minutes, e.g. 1m, 15m, 1h, 1d (default: 1m).")
+    pst.add_argument("--by", action="append", choices=["level", "l_type", "uuid", "subsystem"], default=None,
+                     help="Count per value of this column in each bucket (repeatable, default: level).")
+    pst.add_argument("--uuid", default=None, help="Filter by originator UUID.")
+    pst.add_argument("--subsystem", default=None, help="Filter by subsystem (data.subsystem).")
+    pst.add_argument("--since", default=None, help="Start time (assume local if no timezone), rounded down to the minute.")
+    pst.add_argument("--until", default=None, help="End time (assume local if no timezone), rounded up to the minute.")
+    pst.add_argument("--type", dest="l_type", default=None, help="Filter by l_type (e.g. EXP, SOFTW).")
+    pst.add_argument("--exclude-type", dest="exclude_types", action="append", default=[], help="Exclude an l_type (repeatable).")
+    pst.add_argument("--include-rec", action="store_true", help="Include REC (excluded by default).")
+    pst.add_argument("--level", default=None, help="Filter by exact level string.")
+    pst.add_argument("--min-level", default=None, help="Filter by minimum level.")
+    pst.set_defaults(fn=cmd_log_stats)
+
+    pc = sub_log.add_parser("compress", help="Compress sealed segments of an archive into seekable blocks.")
+    add_log_dir_arg(pc, help_text="Log root directory (default: env var / platform default).")
+    pc.add_argument("--archive", default="current")
+    pc.add_argument("--codec", choices=["zlib", "lzma"], default="zlib")
+    pc.add_argument("--include-last", dest="include_last", action="store_true",
+                    help="Also compress the last segment (only when no logger is writing to the archive).")
+    pc.set_defaults(fn=cmd_log_compress)
+
     ploc = sub_log.add_parser("locate", help="Find which archive contains a given global line number.")
     add_log_dir_arg(ploc, help_text="Log root directory (default: env var / platform default).")
     ploc.add_argument("--line", type=int, required=True)
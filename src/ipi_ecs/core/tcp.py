@@ -70,8 +70,12 @@ def __b_escaped(b: bytes, i: int):
     
     return False
 
-def sliced(b: bytes):
-    s = 0
+def sliced(b: bytes, start: int = 0):
+    """
+    Split off the first complete (unescaped DELIM terminated) chunk.
+    start lets callers skip the part of b they already scanned without finding one.
+    """
+    s = start
     while s != -1:
         i = b.find(DELIM, s)
 
@@ -129,6 +133,7 @@ class TCPSocket:
         self.__daemon.add(self.__send_thread)
 
         self.__buffer = bytes()
+        self.__scan_pos = 0
 
         self._closed_event = mt_events.Event()
         self._shutdown_event = mt_events.Event()
@@ -213,15 +218,18 @@ class TCPSocket:
         
         while True:
             #print(self.__buffer)
-            chk, self.__buffer = sliced(self.__buffer)
+            # Large messages arrive in many chunks, don't rescan what was already searched.
+            chk, self.__buffer = sliced(self.__buffer, self.__scan_pos)
             #print(chk, self.__buffer)
             #print("split", chk, self.__buffer)
 
             if chk is not None:
+                self.__scan_pos = 0
                 if len(chk) > 0:
                     self.__recv_queue.put(unescape_bytes(chk))
                     self._received_event.call()
             else:
+                self.__scan_pos = len(self.__buffer)
                 break
 
     def __send_thread(self, stop_flag : daemon.StopFlag):
@@ -313,6 +321,16 @@ class TCPSocket:
 
         return self.__recv_queue.empty()
 
+    def pending(self):
+        """
+        Returns number of messages waiting in the send queue
+
+        Returns:
+            int: Queued messages
+        """
+
+        return self._send_queue.qsize()
+
     def remote(self):
         """
         Returns remote connection address
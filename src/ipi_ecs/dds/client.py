@@ -1,7 +1,9 @@
 import queue
 import time
 import uuid
+import threading
 import traceback
+import contextlib
 import segment_bytes
 import mt_events
 
@@ -10,7 +12,7 @@ from ipi_ecs.core import daemon
 from ipi_ecs.core import transactions
 
 from ipi_ecs.dds.subsystem import SubsystemInfo, KVDescriptor, EventDescriptor, StatusItem, SubsystemStatus
-from ipi_ecs.dds.types import PropertyTypeSpecifier, ByteTypeSpecifier
+from ipi_ecs.dds.types import PropertyTypeSpecifier, ByteTypeSpecifier, SampleBatchTypeSpecifier
 
 # I don't want to have to add all magic values one by one, pylance! Stop complaining!
 # pylint: disable=wildcard-import, unused-wildcard-import
@@ -83,6 +85,9 @@ class _RegisteredSubsystemHandle:
     
     def add_remote_kv(self, t_uuid: uuid.UUID, desc: KVDescriptor):
         return self.__subsystem.add_remote_kv(t_uuid, desc)
+
+    def add_log_filter_kv(self, key : bytes = b"log_filter"):
+        return self.__subsystem.add_log_filter_kv(key)
     
     def get_kv(self, target_uuid : uuid.UUID, key : bytes, ret = KVP_RET_AWAIT):
         return self.__subsystem.get_kv(target_uuid, key, ret)
@@ -117,6 +122,12 @@ class _RegisteredSubsystemHandle:
     def reset_status_items(self):
         self.__subsystem.reset_status_items()
 
+    def batch_declare(self):
+        return self.__subsystem.batch_declare()
+
+    def flush_registration(self):
+        self.__subsystem.flush_registration()
+
 class _RemoteSubsystemHandle:
     def __init__(self, client: "DDSClient", info: SubsystemInfo, me: "DDSClient._RegisteredSubsystem"):
         self.__info = info
@@ -560,9 +571,22 @@ class _LocalProperty(_KVHandlerBase):
 
         def on_new_data_received(self, func):
             self.__property.on_new_data_received(func)
+
+        def append_samples(self, samples):
+            self.__property.append_samples(samples)
+
+        def flush_samples(self):
+            self.__property.flush_samples()
+
+        def set_sample_flush(self, max_samples = None, max_age_s = None):
+            self.__property.set_sample_flush(max_samples, max_age_s)
         
 
         value = property(__read, __write, __del)
+
+    SAMPLE_FLUSH_MAX = 512
+    SAMPLE_FLUSH_AGE_S = 0.1
+
     def __init__(self, key : str, subsystem: "DDSClient._RegisteredSubsystem", write = True, read = True, send = False):
         self.__key = key
         self.__writable = write
@@ -581,6 +605,12 @@ class _LocalProperty(_KVHandlerBase):
 
         self.__value = None
 
+        self.__samples = []
+        self.__sample_lock = threading.RLock()
+        self.__sample_timer = None
+        self.__sample_max = self.SAMPLE_FLUSH_MAX
+        self.__sample_max_age_s = self.SAMPLE_FLUSH_AGE_S
+
     def remote_set(self, requester: uuid.UUID, value : bytes):
         if not self.__writable:
             return (TRANSOP_STATE_REJ, E_READONLY)
@@ -620,6 +650,69 @@ class _LocalProperty(_KVHandlerBase):
     def handle_get_value(self):
         return self.__p_type.parse(self.__value)
     
+    def append_samples(self, samples):
+        """
+        Queue (timestamp_ns, value) samples for a SampleBatchTypeSpecifier property.
+        Queued samples are set as one value once max_samples are pending or the oldest is max_age_s old.
+        All samples are checked before any is queued (a batch flushed by the timer must not fail to
+        encode), so an invalid sample rejects the whole call.
+        """
+        if not isinstance(self.__p_type, SampleBatchTypeSpecifier):
+            raise ValueError("append_samples requires a SampleBatchTypeSpecifier property type")
+        
+        samples = list(samples)
+
+        with self.__sample_lock:
+            last = self.__samples[-1][0] if len(self.__samples) > 0 else None
+            for ts, v in samples:
+                self.__p_type.check_sample(ts, v)
+
+                if last is not None and ts < last:
+                    raise ValueError("Samples must be appended in timestamp order")
+                last = ts
+
+            max_samples = min(self.__sample_max, self.__p_type.get_max_samples())
+
+            for ts, v in samples:
+                if len(self.__samples) > 0:
+                    last = self.__samples[-1][0]
+
+                    # The delta to the previous sample would not fit the batch encoding, start a new batch.
+                    if ts - last > SampleBatchTypeSpecifier.MAX_DELTA_NS:
+                        self.flush_samples()
+
+                self.__samples.append((ts, v))
+
+                if len(self.__samples) >= max_samples:
+                    self.flush_samples()
+
+            if len(self.__samples) > 0 and self.__sample_timer is None:
+                self.__sample_timer = threading.Timer(self.__sample_max_age_s, self.flush_samples)
+                self.__sample_timer.daemon = True
+                self.__sample_timer.start()
+
+    def flush_samples(self):
+        with self.__sample_lock:
+            if self.__sample_timer is not None:
+                self.__sample_timer.cancel()
+                self.__sample_timer = None
+
+            if len(self.__samples) == 0:
+                return
+            
+            batch = self.__samples
+            self.__samples = []
+
+            self.handle_set_value(batch)
+
+    def set_sample_flush(self, max_samples = None, max_age_s = None):
+        with self.__sample_lock:
+            if max_samples is not None:
+                self.__sample_max = max_samples
+
+            if max_age_s is not None:
+                self.__sample_max_age_s = max_age_s
+
     def get_handle(self):
         return self.__property_handler
     
@@ -800,10 +893,18 @@ class DDSClient:
     REG_STATE_NOT_REGISTERED = 2
 
     class _RegisteredSubsystem:
+        # Declarations made within this window are coalesced into a single registration.
+        REG_DEBOUNCE_S = 0.05
+
         def __init__(self, info: "SubsystemInfo", client: "DDSClient", logger = None):
             self.__info = info
             self.__client = client
 
+            self.__reg_lock = threading.RLock()
+            self.__reg_dirty = False
+            self.__reg_batch_depth = 0
+            self.__reg_timer = None
+
             self.__kv_providers = dict()
             self.__event_handlers = dict()
             self.__event_providers = dict()
@@ -855,6 +956,39 @@ class DDSClient:
         def add_remote_kv(self, t_uuid : uuid.UUID, desc : KVDescriptor):
             lp = _RemoteProperty.from_descriptor(desc, self, t_uuid)
             return lp.get_handle()
+
+        def add_log_filter_kv(self, key : bytes = b"log_filter"):
+            """
+            Expose this subsystem's client-side log filter as a KV. Values are b"LEVEL" or
+            b"LEVEL:L_TYPE,L_TYPE" (e.g. b"INFO:SW,EXP"), an empty value removes the filter.
+            """
+            h = self.add_kv_handler(key)
+            h.on_get(self.__on_log_filter_get)
+            h.on_set(self.__on_log_filter_set)
+            return h
+
+        def __on_log_filter_get(self, requester):
+            if self.__logger is None:
+                return (TRANSOP_STATE_OK, bytes())
+
+            level, l_types = self.__logger.get_filter(self.get_info().get_name())
+            v = (level or "") + (":" + ",".join(l_types) if l_types is not None else "")
+            return (TRANSOP_STATE_OK, v.encode("utf-8"))
+
+        def __on_log_filter_set(self, h, requester, v : bytes):
+            if self.__logger is None:
+                return (TRANSOP_STATE_REJ, b"Subsystem has no logger.")
+
+            level, _, l_types = v.decode("utf-8").strip().partition(":")
+            name = self.get_info().get_name()
+
+            try:
+                self.__logger.set_min_level(level.strip() or None, name)
+            except ValueError as e:
+                return (TRANSOP_STATE_REJ, str(e).encode("utf-8"))
+
+            self.__logger.set_l_types([t.strip() for t in l_types.split(",") if t.strip()] if l_types else None, name)
+            return (TRANSOP_STATE_OK, bytes())
         
         def get_client(self):
             return self.__client
@@ -874,7 +1008,7 @@ class DDSClient:
         def get_kv_descriptors(self):
             r = []
 
-            for (_, kvp) in self.__kv_providers.items():
+            for kvp in list(self.__kv_providers.values()):
                 r.append(kvp.get_type_descriptor(self.get_uuid()))
             
             return segment_bytes.encode(r)
@@ -883,10 +1017,10 @@ class DDSClient:
             h = []
             p = []
 
-            for (_, e) in self.__event_handlers.items():
+            for e in list(self.__event_handlers.values()):
                 h.append(e.get_descriptor(self.get_uuid()))
 
-            for (_, e) in self.__event_providers.items():
+            for e in list(self.__event_providers.values()):
                 p.append(e.get_descriptor(self.get_uuid()))
             
             return segment_bytes.encode([segment_bytes.encode(p), segment_bytes.encode(h)])
@@ -900,8 +1034,61 @@ class DDSClient:
             return kvp.get_type_descriptor(requester)
         
         def invalidate(self):
-            self.__info = SubsystemInfo(self.__info.get_uuid(), self.__info.get_name(), self.__info.get_temporary(), self.get_kv_descriptors(), self.get_event_descriptors())
-            self.__client.send_subsystem_info(self.__info)
+            """
+            Mark the registration as stale. The rebuilt SubsystemInfo is sent once the
+            surrounding batch_declare() block exits, or after REG_DEBOUNCE_S otherwise.
+            """
+            with self.__reg_lock:
+                self.__reg_dirty = True
+
+                if self.__reg_batch_depth > 0 or self.__reg_timer is not None:
+                    return
+
+                self.__reg_timer = threading.Timer(self.REG_DEBOUNCE_S, self.flush_registration)
+                self.__reg_timer.daemon = True
+                self.__reg_timer.start()
+
+        @contextlib.contextmanager
+        def batch_declare(self):
+            """
+            Defer registration until the block exits, e.g.
+
+                with handle.batch_declare():
+                    for key in keys:
+                        handle.get_kv_property(key)
+            """
+            with self.__reg_lock:
+                self.__reg_batch_depth += 1
+
+            try:
+                yield
+            finally:
+                with self.__reg_lock:
+                    self.__reg_batch_depth -= 1
+                    flush = self.__reg_batch_depth == 0
+
+                if flush:
+                    self.flush_registration()
+
+        def flush_registration(self, force = False):
+            """
+            Rebuild SubsystemInfo and send it to the server if any declaration changed since the last flush.
+            """
+            with self.__reg_lock:
+                if self.__reg_timer is not None:
+                    self.__reg_timer.cancel()
+                    self.__reg_timer = None
+
+                if not (self.__reg_dirty or force):
+                    return
+
+                self.__reg_dirty = False
+                self.__info = SubsystemInfo(self.__info.get_uuid(), self.__info.get_name(), self.__info.get_temporary(), self.get_kv_descriptors(), self.get_event_descriptors())
+                info = self.__info
+
+            # Not connected yet: DDSClient re-sends every subsystem once it becomes ready.
+            if self.__client.is_ready():
+                self.__client.send_subsystem_info(info)
 
         def reconnected(self):
             for item in self.__active_status_items.values():
@@ -982,6 +1169,14 @@ class DDSClient:
             
             self.__logger.log(msg, level=level, l_type="SW", subsystem=self.get_info().get_name(), **data)
 
+        def log_lazy(self, level, fn, **kwargs):
+            if self.__logger is None:
+                ret = fn()
+                print(level, ret[0] if isinstance(ret, tuple) else ret)
+                return
+
+            self.__logger.log_lazy(level, fn, l_type="SW", subsystem=self.get_info().get_name(), **kwargs)
+
         def get_status_item_exists(self, code: int):
             return code in self.__active_status_items
 
@@ -1012,6 +1207,9 @@ class DDSClient:
         self.__active_subscribers = dict()
 
         self.__cached_subsystems = dict()
+        self.__decoded_infos = dict()
+        self.__decoded_states = dict()
+        self.__system_views = dict()
 
         self.__is_ready = False
 
@@ -1072,15 +1270,31 @@ class DDSClient:
                 elif d[0] == MAGIC_SYSTEM_UPD:
                     s_data = segment_bytes.decode(d[1:])
                     new_cached_subsystems = dict()
+                    new_decoded_infos = dict()
+                    new_decoded_states = dict()
                     for b_data in s_data:
                         b_info, b_status = segment_bytes.decode(b_data)
-                        info = SubsystemInfo.decode(b_info)
-                        state = SubsystemStatus.decode(b_status)
+                        b_info = bytes(b_info)
+                        b_status = bytes(b_status)
+
+                        # Most updates only touch one subsystem; keep the decoded objects
+                        # of all others so their cached descriptors survive the update.
+                        info = self.__decoded_infos.get(b_info)
+                        if info is None:
+                            info = SubsystemInfo.decode(b_info)
 
+                        state = self.__decoded_states.get((info.get_uuid(), b_status))
+                        if state is None:
+                            state = SubsystemStatus.decode(b_status)
+
+                        new_decoded_infos[b_info] = info
+                        new_decoded_states[(info.get_uuid(), b_status)] = state
                         new_cached_subsystems[info.get_uuid()] = (info, state)
 
                     # The server publishes the full subsystem list. Replace the cache so
                     # removed temporary subsystems do not linger locally.
+                    self.__decoded_infos = new_decoded_infos
+                    self.__decoded_states = new_decoded_states
                     self.__cached_subsystems = new_cached_subsystems
                     self.__remote_subsystem_update_event.call()
                 elif d[0] == MAGIC_EVENT_RET:
@@ -1278,8 +1492,8 @@ class DDSClient:
         self.__ready_event.call()
         self.__is_ready = True
 
-        for s in self.__subsystem_handles.values():
-            s.invalidate()
+        for s in list(self.__subsystem_handles.values()):
+            s.flush_registration(force=True)
 
         #self.__send_subsystem_infos()
         self.__refresh_subscriptions()
@@ -1298,6 +1512,9 @@ class DDSClient:
 
     def ok(self):
         return not self.__socket.is_closed() and self.__daemon.is_ok()
+
+    def is_ready(self):
+        return self.__is_ready
     
     def register_subsystem(self, name: str, s_uuid: uuid.UUID, temporary = False):
         info = SubsystemInfo(s_uuid, name, temporary)
@@ -1416,9 +1633,23 @@ class DDSClient:
         return self.__registered
     
     def get_system(self, subsystem : "DDSClient._RegisteredSubsystem") -> list[tuple["_RemoteSubsystemHandle", SubsystemStatus]]:
+        # Remote handles are kept per requesting subsystem and only rebuilt when the
+        # corresponding SubsystemInfo object was replaced by a system update.
+        view = self.__system_views.setdefault(subsystem.get_uuid(), dict())
+        cached = self.__cached_subsystems
         ret = []
-        for info, state in self.__cached_subsystems.values():
-            ret.append((_RemoteSubsystemHandle(self, info, subsystem), state))
+
+        for s_uuid, (info, state) in cached.items():
+            handle = view.get(s_uuid)
+
+            if handle is None or handle.get_info() is not info:
+                handle = _RemoteSubsystemHandle(self, info, subsystem)
+                view[s_uuid] = handle
+
+            ret.append((handle, state))
+
+        for s_uuid in [s_uuid for s_uuid in view if s_uuid not in cached]:
+            view.pop(s_uuid, None)
 
         return ret
     
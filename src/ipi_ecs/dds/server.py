@@ -543,7 +543,13 @@ class _DDSServer:
             #    print("Subsystem is TEMPORARY. It will be removed once it's client disconnects!")
 
         if subsystem.get_client_uuid() == c_uuid:
+            changed = subsystem.get_info().encode() != s_info.encode()
             subsystem.update_info(s_info)
+
+            # Clients batch their declarations, so a re-registration carries a whole
+            # set of new KVs / events that the other clients need to see.
+            if changed:
+                self._send_subsystems()
             return True
         
         ok = subsystem.bind_client(self.__clients_uuid[c_uuid])
@@ -12,6 +12,10 @@ class SubsystemInfo:
         self.__temporary = temporary
         self.__kv_infos = kv_infos
         self.__events = events
+
+        # Decoded lazily on first access, the encoded form never changes.
+        self.__kvs = None
+        self.__event_descs = None
     
     def get_uuid(self):
         return self.__uuid
@@ -23,15 +27,25 @@ class SubsystemInfo:
         return self.__temporary
     
     def get_kvs(self):
-        kv_sep = segment_bytes.decode(self.__kv_infos)
-        descs = []
+        if self.__kvs is None:
+            kv_sep = segment_bytes.decode(self.__kv_infos)
+            descs = []
+
+            for kv_desc in kv_sep:
+                descs.append(KVDescriptor.decode(kv_desc))
 
-        for kv_desc in kv_sep:
-            descs.append(KVDescriptor.decode(kv_desc))
+            self.__kvs = descs
 
-        return descs
+        return list(self.__kvs)
     
     def get_events(self):
+        if self.__event_descs is None:
+            self.__event_descs = self.__decode_events()
+
+        providers, handlers = self.__event_descs
+        return (list(providers), list(handlers))
+
+    def __decode_events(self):
         if len(self.__events) == 0:
             return ([], [])
         
@@ -1,5 +1,14 @@
+import re
 import struct
+import functools
+import itertools
 import segment_bytes
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 from ipi_ecs.dds.magics import *
 
 class TypeManager:
@@ -77,6 +86,9 @@ class IntegerTypeSpecifier(PropertyTypeSpecifier):
         
         return data.to_bytes(byteorder="big", length=8, signed=True)
     
+    def get_range(self):
+        return (self.__min, self.__max)
+    
     def encode_type(self):
         if self.__min is not None:
             return segment_bytes.encode([self.__min.to_bytes(length=8, byteorder="big"), self.__max.to_bytes(length=8, byteorder="big")])
@@ -114,6 +126,9 @@ class FloatTypeSpecifier(PropertyTypeSpecifier):
         
         return struct.pack("d", data)
     
+    def get_range(self):
+        return (self.__min, self.__max)
+    
     def encode_type(self):
         if self.__min is not None:
             return segment_bytes.encode([struct.pack("d", self.__min), struct.pack("d", self.__max)])
@@ -155,6 +170,12 @@ class VectorTypeSpecifier(PropertyTypeSpecifier):
         
         return segment_bytes.encode(encoded_elements)
     
+    def get_element_type(self):
+        return self.__element_type
+    
+    def get_length(self):
+        return self.__length
+    
     def encode_type(self):
         element_type_data = encode(self.__element_type)
         length_data = self.__length.to_bytes(length=4, byteorder="big")
@@ -170,11 +191,342 @@ class VectorTypeSpecifier(PropertyTypeSpecifier):
 
         return VectorTypeSpecifier(element_type, length)
 
+class PackedVectorTypeSpecifier(VectorTypeSpecifier):
+    """
+    Fixed-length vector of Integer or Float elements, packed into one contiguous
+    big-endian block instead of one segment per element.
+    Uses its own type identifier, peers that only know VectorTypeSpecifier keep using that.
+    """
+    __FORMATS = {IntegerTypeSpecifier: "q", FloatTypeSpecifier: "d"}
+
+    def __init__(self, element_type : PropertyTypeSpecifier, length : int):
+        super().__init__(element_type, length)
+
+        fmt = self.__FORMATS.get(type(element_type))
+        if fmt is None:
+            raise ValueError("Packed vectors only support Integer and Float elements")
+
+        self.__struct = struct.Struct(f">{length}{fmt}")
+        self.__min, self.__max = element_type.get_range()
+
+    def __check_range(self, values):
+        if len(values) == 0:
+            return
+        
+        if (self.__max is not None and max(values) > self.__max) or (self.__min is not None and min(values) < self.__min):
+            raise ValueError()
+
+    def parse(self, data : bytes):
+        if len(data) != self.__struct.size:
+            raise ValueError()
+        
+        result = list(self.__struct.unpack(data))
+        self.__check_range(result)
+
+        return result
+    
+    def encode(self, data : list):
+        if len(data) != self.get_length():
+            raise ValueError()
+        
+        self.__check_range(data)
+
+        try:
+            return self.__struct.pack(*data)
+        except struct.error as e:
+            raise ValueError() from e
+    
+    @staticmethod
+    def decode_type(data : bytes):
+        datas = segment_bytes.decode(data)
+
+        element_type = decode(datas[0])
+        length = int.from_bytes(datas[1], byteorder="big")
+
+        return PackedVectorTypeSpecifier(element_type, length)
+
+class NDArrayTypeSpecifier(PropertyTypeSpecifier):
+    """
+    N-dimensional numpy array with a fixed dtype and shape. One dimension may be None,
+    in which case it is inferred from the payload size.
+    Parsed values are read-only views over the received bytes (no copy).
+    Requires numpy to encode / parse values, descriptors can be handled without it; the dtype then
+    has to be given in its explicit-endianness form (np.dtype(...).str, e.g. "<f8").
+    """
+    __DIM_ANY = 0xFFFFFFFF
+    __DTYPE_STR = re.compile(r"[<>|][a-zA-Z]\d+(\[\w+\])?")
+
+    def __init__(self, dtype, shape : tuple):
+        shape = tuple(shape)
+        if sum(1 for d in shape if d is None) > 1:
+            raise ValueError("At most one dimension can be variable")
+        
+        # Store the explicit-endianness dtype string (e.g. "<f8") so both sides agree on byte order.
+        if np is not None:
+            self.__dtype = np.dtype(dtype).str
+        elif isinstance(dtype, str) and self.__DTYPE_STR.fullmatch(dtype):
+            self.__dtype = dtype
+        else:
+            raise ValueError(f"Without numpy the dtype must be an explicit-endianness string such as '<f8', got {dtype!r}")
+        self.__shape = shape
+
+    def __require_numpy(self):
+        if np is None:
+            raise RuntimeError("NDArrayTypeSpecifier requires numpy")
+        
+        return np.dtype(self.__dtype)
+    
+    def __resolve_shape(self, n_items : int):
+        fixed = 1
+        for d in self.__shape:
+            if d is not None:
+                fixed *= d
+
+        if None not in self.__shape:
+            if fixed != n_items:
+                raise ValueError()
+            return self.__shape
+
+        if fixed == 0 or n_items % fixed != 0:
+            raise ValueError()
+
+        return tuple(n_items // fixed if d is None else d for d in self.__shape)
+
+    def parse(self, data : bytes):
+        dtype = self.__require_numpy()
+
+        if len(data) % dtype.itemsize != 0:
+            raise ValueError()
+
+        shape = self.__resolve_shape(len(data) // dtype.itemsize)
+        return np.frombuffer(data, dtype=dtype).reshape(shape)
+    
+    def encode(self, data):
+        dtype = self.__require_numpy()
+
+        # No copy if data already is a C-contiguous array of the right dtype.
+        arr = np.ascontiguousarray(data, dtype=dtype)
+        if arr.shape != self.__resolve_shape(arr.size):
+            raise ValueError()
+        
+        if arr.nbytes > 0xFFFF:
+            raise ValueError(f"Array of {arr.nbytes} bytes exceeds the maximum value size of {0xFFFF} bytes")
+
+        return arr.tobytes()
+    
+    def get_dtype(self):
+        return self.__dtype
+    
+    def get_shape(self):
+        return self.__shape
+    
+    def encode_type(self):
+        b_shape = bytes()
+        for d in self.__shape:
+            b_shape += (self.__DIM_ANY if d is None else d).to_bytes(length=4, byteorder="big")
+
+        return segment_bytes.encode([self.__dtype.encode("utf-8"), b_shape])
+    
+    @staticmethod
+    def decode_type(data : bytes):
+        b_dtype, b_shape = segment_bytes.decode(data)
+
+        shape = []
+        for i in range(0, len(b_shape), 4):
+            d = int.from_bytes(b_shape[i:i + 4], byteorder="big")
+            shape.append(None if d == NDArrayTypeSpecifier.__DIM_ANY else d)
+
+        return NDArrayTypeSpecifier(bytes(b_dtype).decode("utf-8"), tuple(shape))
+
+class StructTypeSpecifier(PropertyTypeSpecifier):
+    """
+    Record of named Integer / Float fields, compiled once into a single struct.Struct
+    so a multi-field reading travels as one compact KV value.
+    Parses to a dict, encodes from a dict or a sequence in field order.
+    """
+    __FORMATS = {IntegerTypeSpecifier: "q", FloatTypeSpecifier: "d"}
+
+    def __init__(self, fields : list):
+        fmt = ">"
+        names = []
+        specs = []
+
+        for name, f_type in fields:
+            code = self.__FORMATS.get(type(f_type))
+            if code is None:
+                raise ValueError("Struct fields must be Integer or Float types")
+            
+            if name in names:
+                raise ValueError(f"Duplicate struct field: {name}")
+
+            fmt += code
+            names.append(name)
+            specs.append(f_type)
+
+        self.__names = tuple(names)
+        self.__specs = tuple(specs)
+        self.__ranges = tuple(f_type.get_range() for f_type in specs)
+        self.__struct = struct.Struct(fmt)
+
+    def __check_ranges(self, values):
+        for v, (r_min, r_max) in zip(values, self.__ranges):
+            if (r_max is not None and v > r_max) or (r_min is not None and v < r_min):
+                raise ValueError()
+
+    def parse(self, data : bytes):
+        if len(data) != self.__struct.size:
+            raise ValueError()
+        
+        values = self.__struct.unpack(data)
+        self.__check_ranges(values)
+
+        return dict(zip(self.__names, values))
+    
+    def encode(self, data):
+        if isinstance(data, dict):
+            if len(data) != len(self.__names):
+                raise ValueError()
+            
+            try:
+                values = tuple(data[name] for name in self.__names)
+            except KeyError as e:
+                raise ValueError() from e
+        else:
+            values = tuple(data)
+
+        if len(values) != len(self.__names):
+            raise ValueError()
+        
+        self.__check_ranges(values)
+
+        try:
+            return self.__struct.pack(*values)
+        except struct.error as e:
+            raise ValueError() from e
+        
+    def get_fields(self):
+        return list(zip(self.__names, self.__specs))
+    
+    def encode_type(self):
+        b_fields = []
+        for name, f_type in zip(self.__names, self.__specs):
+            b_fields.append(segment_bytes.encode([name.encode("utf-8"), encode(f_type)]))
+
+        return segment_bytes.encode(b_fields)
+    
+    @staticmethod
+    def decode_type(data : bytes):
+        fields = []
+        for b_field in segment_bytes.decode(data):
+            b_name, b_type = segment_bytes.decode(b_field)
+            fields.append((bytes(b_name).decode("utf-8"), decode(b_type)))
+
+        return StructTypeSpecifier(fields)
+
+class SampleBatchTypeSpecifier(PropertyTypeSpecifier):
+    """
+    Batch of (timestamp_ns, value) samples of an Integer or Float element type.
+    Encoded as a base timestamp, the sample count, non-decreasing u32 nanosecond
+    deltas between consecutive samples and the packed values.
+    """
+    __FORMATS = {IntegerTypeSpecifier: "q", FloatTypeSpecifier: "d"}
+    __HEADER = struct.Struct(">qI")
+    MAX_DELTA_NS = 0xFFFFFFFF
+
+    def __init__(self, element_type : PropertyTypeSpecifier):
+        code = self.__FORMATS.get(type(element_type))
+        if code is None:
+            raise ValueError("Sample batches only support Integer and Float elements")
+        
+        self.__element_type = element_type
+        self.__code = code
+        self.__sample = struct.Struct(f">q{code}")
+        self.__min, self.__max = element_type.get_range()
+
+    def get_element_type(self):
+        return self.__element_type
+    
+    def get_max_samples(self):
+        # A value has to fit into one segment.
+        return (0xFFFF - self.__HEADER.size) // (4 + 8)
+    
+    def __check_range(self, values):
+        if len(values) == 0:
+            return
+        
+        if (self.__max is not None and max(values) > self.__max) or (self.__min is not None and min(values) < self.__min):
+            raise ValueError()
+
+    def check_sample(self, ts, value):
+        """Raise ValueError if a single sample cannot be encoded."""
+        try:
+            self.__sample.pack(ts, value)
+        except struct.error as e:
+            raise ValueError(f"Invalid sample ({ts!r}, {value!r}): {e}") from e
+        
+        self.__check_range([value])
+
+    def parse(self, data : bytes):
+        if len(data) < self.__HEADER.size:
+            raise ValueError()
+        
+        base, n = self.__HEADER.unpack_from(data)
+        body = _batch_struct(n, self.__code)
+
+        if len(data) != self.__HEADER.size + body.size:
+            raise ValueError()
+        
+        unpacked = body.unpack_from(data, self.__HEADER.size)
+        values = unpacked[n:]
+        self.__check_range(values)
+
+        timestamps = itertools.accumulate(unpacked[:n], initial=base)
+        next(timestamps)
+
+        return list(zip(timestamps, values))
+    
+    def encode(self, data : list):
+        n = len(data)
+        if n > self.get_max_samples():
+            raise ValueError(f"Sample batch of {n} samples exceeds the maximum of {self.get_max_samples()}")
+        
+        timestamps = [ts for ts, _ in data]
+        values = [v for _, v in data]
+        self.__check_range(values)
+
+        base = timestamps[0] if n > 0 else 0
+        deltas = [b - a for a, b in zip([base] + timestamps, timestamps)]
+
+        for d in deltas:
+            if d < 0 or d > self.MAX_DELTA_NS:
+                raise ValueError("Sample timestamps must be non-decreasing and at most MAX_DELTA_NS apart")
+
+        try:
+            return self.__HEADER.pack(base, n) + _batch_struct(n, self.__code).pack(*deltas, *values)
+        except struct.error as e:
+            raise ValueError() from e
+    
+    def encode_type(self):
+        return segment_bytes.encode([encode(self.__element_type)])
+    
+    @staticmethod
+    def decode_type(data : bytes):
+        (b_element,) = segment_bytes.decode(data)
+        return SampleBatchTypeSpecifier(decode(b_element))
+    
+@functools.lru_cache(maxsize=64)
+def _batch_struct(n : int, code : str):
+    return struct.Struct(f">{n}I{n}{code}")
+
 types = TypeManager()
 types.define_type(ByteTypeSpecifier)
 types.define_type(IntegerTypeSpecifier)
 types.define_type(FloatTypeSpecifier)
 types.define_type(VectorTypeSpecifier)
+types.define_type(PackedVectorTypeSpecifier)
+types.define_type(NDArrayTypeSpecifier)
+types.define_type(StructTypeSpecifier)
+types.define_type(SampleBatchTypeSpecifier)
 
 def encode(s : "PropertyTypeSpecifier"):
     type_data = s.encode_type()
@@ -183,6 +535,12 @@ def encode(s : "PropertyTypeSpecifier"):
     return segment_bytes.encode([identifier, type_data])
 
 def decode(d : bytes):
+    # Type specifiers are immutable, so identical descriptors share one instance
+    # instead of being re-decoded every time a SubsystemInfo is read.
+    return _decode_interned(bytes(d))
+
+@functools.lru_cache(maxsize=1024)
+def _decode_interned(d : bytes):
     datas = segment_bytes.decode(d)
 
     if len(datas) != 2:
@@ -193,4 +551,7 @@ def decode(d : bytes):
 
 
     p_type = types.get_type(identifier)
+    if p_type is None:
+        raise ValueError(f"Unknown type identifier: {identifier}")
+
     return p_type.decode_type(data)
\ No newline at end of file
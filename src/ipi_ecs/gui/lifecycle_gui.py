@@ -187,6 +187,9 @@ class LifecycleInterface:
 		t = desc.get_type()
 		if t is None:
 			return "Unknown"
+		if isinstance(t, dds_types.StructTypeSpecifier):
+			fields = ", ".join(f"{name}: {type(f_type).__name__}" for name, f_type in t.get_fields())
+			return f"{type(t).__name__}({fields})"
 		return type(t).__name__
 
 	@staticmethod
@@ -468,6 +471,8 @@ class LifecycleInterface:
 			if len(value) <= 64:
 				return f"bytes[{len(value)}]: {value.hex()}"
 			return f"bytes[{len(value)}]: {value[:32].hex()}..."
+		if isinstance(value, dict):
+			return ", ".join(f"{k}={v}" for k, v in value.items())
 		return str(value)
 
 	@staticmethod
@@ -514,7 +519,7 @@ class LifecycleInterface:
 			if not isinstance(v, list):
 				raise ValueError("Vector input must be a Python list literal.")
 
-			e_type = getattr(type_spec, "_VectorTypeSpecifier__element_type", None)
+			e_type = type_spec.get_element_type()
 			if e_type is None:
 				return v
 
@@ -533,6 +538,24 @@ class LifecycleInterface:
 					parsed.append(item)
 			return parsed
 
+		if isinstance(type_spec, dds_types.StructTypeSpecifier):
+			v = ast.literal_eval(text)
+			if not isinstance(v, dict):
+				raise ValueError("Struct input must be a Python dict literal.")
+
+			parsed = {}
+			for name, f_type in type_spec.get_fields():
+				if name not in v:
+					raise ValueError(f"Missing struct field: {name}")
+				parsed[name] = int(v[name]) if isinstance(f_type, dds_types.IntegerTypeSpecifier) else float(v[name])
+			return parsed
+
+		if isinstance(type_spec, dds_types.NDArrayTypeSpecifier):
+			v = ast.literal_eval(text)
+			if not isinstance(v, list):
+				raise ValueError("Array input must be a (nested) Python list literal.")
+			return v
+
 		# Fallback for unknown custom types.
 		return text
 
@@ -1,24 +1,383 @@
 from __future__ import annotations
 
+import os
 import time
 import uuid
+import struct
+import threading
+from collections import deque
 from contextlib import contextmanager
+from pathlib import Path
 from typing import Any, Iterator
 
+from ipi_ecs.core import daemon
 from ipi_ecs.logging.protocol import (
+    PROTO_V1,
+    PROTO_V2,
+    ProtocolError,
+    encode_record_payload,
+    encode_binary_record,
     encode_log_record,
+    encode_log_record_v2,
+    encode_log_batch,
+    encode_log_batch_v2,
     encode_event_begin,
     encode_event_end,
     encode_event_end_last,
 )
 
 
+OVERFLOW_DROP_LOW = "drop_low"        # evict the oldest record of the lowest priority first
+OVERFLOW_DROP_OLDEST = "drop_oldest"  # evict the oldest record regardless of priority
+OVERFLOW_DROP_NEWEST = "drop_newest"  # reject the incoming record
+
+_LOW_LEVELS = ("DEBUG",)
+_HIGH_LEVELS = ("WARN", "WARNING", "ERROR", "CRITICAL")
+_LOW_L_TYPES = ("REC",)
+
+# Ordering used by the client-side level threshold. Levels not listed here are never filtered.
+LEVEL_NUMBERS = {"DEBUG": 10, "INFO": 20, "WARN": 30, "WARNING": 30, "ERROR": 40, "CRITICAL": 50}
+
+
+class _RecordRing:
+    """
+    Bounded FIFO of outgoing messages with priority based eviction.
+    Control messages (event markers) are never evicted and do not count against the capacity check.
+    Not thread safe, LogClient guards it with its lock.
+    """
+    TIER_LOW = 0
+    TIER_NORMAL = 1
+    TIER_HIGH = 2
+    TIER_CONTROL = 3
+
+    def __init__(self, capacity: int, policy: str):
+        if policy not in (OVERFLOW_DROP_LOW, OVERFLOW_DROP_OLDEST, OVERFLOW_DROP_NEWEST):
+            raise ValueError(f"Unknown overflow policy: {policy}")
+
+        self.capacity = capacity
+        self.policy = policy
+
+        self._tiers: list[deque] = [deque() for _ in range(4)]
+        self._order = 0
+        self._size = 0
+
+        self.enqueued = 0
+        self.dropped = 0
+        self.dropped_by_level: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def push(self, tier: int, level: str | None, item: Any) -> bool:
+        """Returns False if the item itself was dropped."""
+        if tier != self.TIER_CONTROL and self._size >= self.capacity:
+            victim = self._select_victim(tier)
+
+            if victim is None:
+                self._count_drop(level)
+                return False
+
+            _, v_level, _ = self._tiers[victim].popleft()
+            self._size -= 1
+            self._count_drop(v_level)
+
+        self._tiers[tier].append((self._order, level, item))
+        self._order += 1
+        self._size += 1
+        self.enqueued += 1
+        return True
+
+    def pop(self, n: int) -> list[Any]:
+        """Pop up to n items in submission order."""
+        out = []
+        while len(out) < n and self._size > 0:
+            heads = [t for t in self._tiers if t]
+            t = min(heads, key=lambda q: q[0][0])
+            out.append(t.popleft()[2])
+            self._size -= 1
+        return out
+
+    def _select_victim(self, tier: int) -> int | None:
+        if self.policy == OVERFLOW_DROP_NEWEST:
+            return None
+
+        if self.policy == OVERFLOW_DROP_OLDEST:
+            heads = [t for t in range(self.TIER_CONTROL) if self._tiers[t]]
+            return min(heads, key=lambda t: self._tiers[t][0][0]) if heads else None
+
+        # Only evict records that are not more important than the incoming one.
+        for t in range(tier + 1):
+            if self._tiers[t]:
+                return t
+        return None
+
+    def _count_drop(self, level: str | None) -> None:
+        self.dropped += 1
+        key = level or "UNKNOWN"
+        self.dropped_by_level[key] = self.dropped_by_level.get(key, 0) + 1
+
+
+class _Spool:
+    """
+    Append-only file of u32 length-prefixed protocol messages, used to store records while
+    the logger is unreachable. The replay offset is persisted in <path>.pos, so a restarted
+    client continues where the previous one stopped. Only used from the sender thread.
+    """
+    _LEN = struct.Struct(">I")
+
+    def __init__(self, path: Path, max_bytes: int):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+        self._pos_path = self.path.with_name(self.path.name + ".pos")
+        self._fp = open(self.path, "a+b")
+
+        self._size = self._recover()
+        self._pos = min(self._read_pos_file(), self._size)
+        self._read_pos = self._pos
+        # (end offset, record count) of chunks appended by this process, for the sent counter.
+        self._records: deque[tuple[int, int]] = deque()
+
+    def _read_pos_file(self) -> int:
+        try:
+            return int(self._pos_path.read_text().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _recover(self) -> int:
+        """Drop a torn trailing frame left by a crash mid-write, returns the valid size."""
+        self._fp.seek(0)
+        valid = 0
+        while True:
+            head = self._fp.read(self._LEN.size)
+            if len(head) < self._LEN.size:
+                break
+
+            (n,) = self._LEN.unpack(head)
+            if len(self._fp.read(n)) < n:
+                break
+            valid += self._LEN.size + n
+
+        self._fp.truncate(valid)
+        return valid
+
+    def backlog(self) -> int:
+        """Bytes not yet handed back for sending."""
+        return self._size - self._read_pos
+
+    def pending(self) -> int:
+        """Bytes not yet confirmed as sent."""
+        return self._size - self._pos
+
+    def full(self) -> bool:
+        return self._size >= self.max_bytes
+
+    def append(self, messages: list[bytes], records: int) -> None:
+        """records is the number of log records in messages, markers not included."""
+        data = b"".join(self._LEN.pack(len(m)) + m for m in messages)
+        self._fp.seek(0, os.SEEK_END)
+        self._fp.write(data)
+        self._fp.flush()
+        self._size += len(data)
+        self._records.append((self._size, records))
+
+    def read(self, max_bytes: int) -> list[bytes]:
+        """Next messages to replay (at least one if any are left)."""
+        out = []
+        read = 0
+        self._fp.seek(self._read_pos)
+
+        while self._read_pos < self._size and (not out or read < max_bytes):
+            (n,) = self._LEN.unpack(self._fp.read(self._LEN.size))
+            out.append(self._fp.read(n))
+            self._read_pos += self._LEN.size + n
+            read += n
+
+        return out
+
+    def rewind(self) -> None:
+        """Hand out everything not committed again, e.g. after the connection dropped."""
+        self._read_pos = self._pos
+
+    def commit(self) -> int:
+        """
+        Everything read so far has been sent. Empties the file once fully replayed. Returns the
+        number of records committed; records spooled by an earlier process are not counted.
+        """
+        if self._read_pos == self._pos:
+            return 0
+
+        self._pos = self._read_pos
+        records = 0
+        while self._records and self._records[0][0] <= self._pos:
+            records += self._records.popleft()[1]
+
+        if self._pos == self._size:
+            self._fp.truncate(0)
+            self._size = self._pos = self._read_pos = 0
+
+        tmp = self._pos_path.with_name(self._pos_path.name + ".tmp")
+        tmp.write_text(str(self._pos))
+        os.replace(tmp, self._pos_path)
+        return records
+
+    def close(self) -> None:
+        self._fp.close()
+
+
 class LogClient:
-    def __init__(self, sock, *, origin_uuid: uuid.UUID | None = None):
+    def __init__(
+        self,
+        sock,
+        *,
+        origin_uuid: uuid.UUID | None = None,
+        batch_max_records: int | None = None,
+        batch_max_bytes: int = 256 * 1024,
+        batch_max_age_s: float = 0.05,
+        proto: int = PROTO_V1,
+        max_pending: int | None = None,
+        overflow_policy: str = OVERFLOW_DROP_LOW,
+        send_watermark: int = 64,
+        drop_report_interval_s: float = 10.0,
+        spool_path: Path | str | None = None,
+        spool_max_bytes: int = 1024 * 1024 * 1024,
+        spool_watermark: int | None = None,
+    ):
+        """
+        Args:
+            sock: Connected TCP socket to the logger server
+            origin_uuid (uuid.UUID): Origin UUID stamped on records (random if omitted)
+            batch_max_records (int | None): Enables batching. Records are buffered and sent as one
+                TYPE_LOG_BATCH message once this many are pending.
+            batch_max_bytes (int): Also send the batch once its encoded size reaches this many bytes
+            batch_max_age_s (float): Also send the batch once its oldest record is this old
+            proto (int): Record encoding, PROTO_V1 (JSON) or PROTO_V2 (binary header + JSON data).
+                Records that do not fit PROTO_V2 (e.g. a non-UUID origin) are sent as PROTO_V1.
+            max_pending (int | None): Enables non-blocking mode. log() only enqueues into a bounded ring
+                of this many records; a sender thread moves them to the socket while it is connected and
+                has fewer than send_watermark messages queued.
+            overflow_policy (str): What to drop when the ring is full: OVERFLOW_DROP_LOW (DEBUG / REC
+                first, WARN+ last), OVERFLOW_DROP_OLDEST or OVERFLOW_DROP_NEWEST
+            send_watermark (int): Socket send queue depth above which the sender thread waits
+            drop_report_interval_s (float): How often a "N log records dropped" WARN record is emitted
+                while records are being dropped
+            spool_path (Path | str | None): Enables store-and-forward. While the logger is unreachable, or
+                the socket is backed up and spool_watermark records are pending, queued messages are
+                appended to this file and replayed in order once the logger keeps up again. Implies
+                non-blocking mode (max_pending defaults to 10000). A spool left by a previous run is
+                replayed on start-up.
+            spool_max_bytes (int): Spool size limit, above it records stay in the ring (and may be dropped)
+            spool_watermark (int | None): Ring depth at which a backed-up socket spills to disk
+                (defaults to half of max_pending)
+        """
         self._sock = sock
         self._origin_uuid = origin_uuid or uuid.uuid4()
         self._seq = 0
 
+        self.batch_max_records = batch_max_records
+        self.batch_max_bytes = batch_max_bytes
+        self.batch_max_age_s = batch_max_age_s
+
+        if proto not in (PROTO_V1, PROTO_V2):
+            raise ValueError(f"Unsupported log protocol version: {proto}")
+        self.proto = proto
+
+        self._lock = threading.RLock()
+        self._batch: list[bytes] = []
+        self._batch_bytes = 0
+        self._batch_timer: threading.Timer | None = None
+
+        self.send_watermark = send_watermark
+        self.drop_report_interval_s = drop_report_interval_s
+
+        # subsystem (None = client default) -> (min level number, allowed l_types or None)
+        self._filters: dict[str | None, tuple[int, frozenset[str] | None]] = {}
+        self._filtered = 0
+
+        self._sent = 0
+        self._ring: _RecordRing | None = None
+        self._spool: _Spool | None = None
+        self._daemon = None
+
+        if spool_path is not None:
+            if max_pending is None:
+                max_pending = 10000
+
+            self._spool = _Spool(Path(spool_path), spool_max_bytes)
+            self.spool_watermark = spool_watermark if spool_watermark is not None else max(1, max_pending // 2)
+
+        if max_pending is not None:
+            self._ring = _RecordRing(max_pending, overflow_policy)
+            self._ring_cond = threading.Condition(self._lock)
+            self._reported_drops = 0
+            self._reported_by_level: dict[str, int] = {}
+            self._last_drop_report = time.monotonic()
+
+            self._daemon = daemon.Daemon()
+            self._daemon.add(self._sender_thread)
+            self._daemon.start()
+
+    def set_min_level(self, level: str | None, subsystem: str | None = None) -> None:
+        """
+        Drop records below level before they are built. With subsystem set, the threshold only applies
+        to records logged with that subsystem=... field and overrides the client default for it.
+        None removes the threshold.
+        """
+        if level is not None and level.upper() not in LEVEL_NUMBERS:
+            raise ValueError(f"Unknown log level: {level}")
+
+        _, l_types = self._get_filter(subsystem)
+        self._set_filter(subsystem, LEVEL_NUMBERS[level.upper()] if level is not None else 0, l_types)
+
+    def set_l_types(self, l_types: list[str] | None, subsystem: str | None = None) -> None:
+        """Only send records whose l_type is in l_types (None allows all). Scoped like set_min_level."""
+        min_no, _ = self._get_filter(subsystem)
+        self._set_filter(subsystem, min_no, frozenset(l_types) if l_types is not None else None)
+
+    def get_filter(self, subsystem: str | None = None) -> tuple[str | None, list[str] | None]:
+        """Effective (min level, allowed l_types) for subsystem."""
+        min_no, l_types = self._get_filter(subsystem)
+        level = next((k for k, v in LEVEL_NUMBERS.items() if v == min_no), None)
+        return level, sorted(l_types) if l_types is not None else None
+
+    def _get_filter(self, subsystem: str | None) -> tuple[int, frozenset[str] | None]:
+        f = self._filters.get(subsystem)
+        if f is None:
+            f = self._filters.get(None, (0, None))
+        return f
+
+    def _set_filter(self, subsystem: str | None, min_no: int, l_types: frozenset[str] | None) -> None:
+        with self._lock:
+            filters = dict(self._filters)
+
+            # An empty filter is removed, a subsystem then falls back to the client default.
+            if min_no == 0 and l_types is None:
+                filters.pop(subsystem, None)
+            else:
+                filters[subsystem] = (min_no, l_types)
+
+            # Swapped as a whole so log() can read it without taking the lock.
+            self._filters = filters
+
+    def is_enabled(self, level: str, l_type: str = "SW", subsystem: str | None = None) -> bool:
+        """True if a record with these fields would be sent."""
+        filters = self._filters
+        if not filters:
+            return True
+
+        f = filters.get(subsystem)
+        if f is None:
+            f = filters.get(None)
+            if f is None:
+                return True
+
+        min_no, l_types = f
+        if l_types is not None and l_type not in l_types:
+            return False
+
+        return LEVEL_NUMBERS.get(level.upper(), min_no) >= min_no
+
     @property
     def origin_uuid(self) -> str:
         # Always expose as a string UUID for log records.
@@ -47,28 +406,334 @@ class LogClient:
             data (Any): Extra data to add to log. Intended usage is for subsystems to store event-related data
                 to enable replay of experiment events.
         """
+        if self._filters and not self.is_enabled(level, l_type, data.get("subsystem")):
+            with self._lock:
+                self._filtered += 1
+            return
 
-        self._seq += 1
+        with self._lock:
+            self._seq += 1
 
-        # The following is Schema v1
-        # MODIFYING THESE KEYS WILL GIVE ME A HEADACHE. DO NOT TOUCH
-        record: dict[str, Any] = {
-            "v": 1,  # record schema version
-            "origin": {
-                "uuid": origin_uuid if origin_uuid is not None else str(self._origin_uuid),
-                "ts_ns": origin_ts_ns if origin_ts_ns is not None else time.time_ns(),
-            },
-            "seq": self._seq,
-            "level": level,
-            "msg": msg,
-            "l_type": l_type,
-            "data": {
-                **({"event": event} if event else {}),
-                **data,
-            },
-        }
+            # The following is Schema v1
+            # MODIFYING THESE KEYS WILL GIVE ME A HEADACHE. DO NOT TOUCH
+            record: dict[str, Any] = {
+                "v": 1,  # record schema version
+                "origin": {
+                    "uuid": origin_uuid if origin_uuid is not None else str(self._origin_uuid),
+                    "ts_ns": origin_ts_ns if origin_ts_ns is not None else time.time_ns(),
+                },
+                "seq": self._seq,
+                "level": level,
+                "msg": msg,
+                "l_type": l_type,
+                "data": {
+                    # subsystem first, the logger picks it up without parsing data
+                    **({"subsystem": data.pop("subsystem")} if "subsystem" in data else {}),
+                    **({"event": event} if event else {}),
+                    **data,
+                },
+            }
+
+            payload = self._encode_v2(record) if self.proto == PROTO_V2 else None
+
+            if self._ring is not None:
+                if payload is None and self.proto == PROTO_V2:
+                    item = (False, encode_log_record(record))
+                else:
+                    item = (True, payload if payload is not None else encode_record_payload(record))
+
+                self._ring.push(self._tier(level, l_type), level, item)
+                self._ring_cond.notify()
+                return
+
+            if self.batch_max_records is None or (payload is None and self.proto == PROTO_V2):
+                if payload is not None:
+                    self._sock.put(encode_log_record_v2(payload))
+                else:
+                    # Keep ordering: anything batched goes out before a record sent on its own.
+                    self.flush()
+                    self._sock.put(encode_log_record(record))
+                self._sent += 1
+                return
+
+            if payload is None:
+                payload = encode_record_payload(record)
+
+            self._batch.append(payload)
+            self._batch_bytes += len(payload)
+
+            if len(self._batch) >= self.batch_max_records or self._batch_bytes >= self.batch_max_bytes:
+                self.flush()
+            elif self._batch_timer is None:
+                self._batch_timer = threading.Timer(self.batch_max_age_s, self.flush)
+                self._batch_timer.daemon = True
+                self._batch_timer.start()
+
+    def log_lazy(
+        self,
+        level: str,
+        fn,
+        *,
+        l_type: str = "SW",
+        subsystem: str | None = None,
+        **kwargs: Any,
+    ) -> None:
+        """
+        Like log(), but the record is only built if it passes the filter. fn() returns either the
+        message or a (message, data dict) tuple.
+
+        Args:
+            level (str): Log level
+            fn (Callable): Builds the message (and data)
+            l_type (str): Log type
+            subsystem (str): Subsystem the record belongs to, used for filtering and stored in data
+            kwargs: Passed on to log() (event, origin_ts_ns, ...)
+        """
+        if self._filters and not self.is_enabled(level, l_type, subsystem):
+            with self._lock:
+                self._filtered += 1
+            return
+
+        ret = fn()
+        msg, data = ret if isinstance(ret, tuple) else (ret, {})
+
+        if subsystem is not None:
+            data = {"subsystem": subsystem, **data}
+
+        self.log(msg, level=level, l_type=l_type, **kwargs, **data)
+
+    def flush(self) -> None:
+        """Send all buffered records now. No-op when batching is disabled."""
+        with self._lock:
+            if self._ring is not None:
+                self._ring_cond.notify()
+                return
+
+            if self._batch_timer is not None:
+                self._batch_timer.cancel()
+                self._batch_timer = None
+
+            if not self._batch:
+                return
+
+            encode = encode_log_batch_v2 if self.proto == PROTO_V2 else encode_log_batch
+            self._sock.put(encode(self._batch))
+            self._sent += len(self._batch)
+            self._batch = []
+            self._batch_bytes = 0
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Send what is still buffered (waiting at most timeout seconds in non-blocking mode) and stop the sender."""
+        self.flush()
+
+        if self._daemon is None:
+            return
+
+        deadline = time.monotonic() + timeout
+        while len(self._ring) > 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        self._daemon.stop()
+
+    def get_counters(self) -> dict[str, Any]:
+        """
+        Delivery counters. dropped / dropped_by_level count records lost to the overflow policy
+        (always 0 outside non-blocking mode), filtered counts records suppressed by the level / l_type filter.
+        """
+        with self._lock:
+            if self._ring is None:
+                return {
+                    "pending": len(self._batch),
+                    "sent": self._sent,
+                    "enqueued": self._seq,
+                    "dropped": 0,
+                    "dropped_by_level": {},
+                    "filtered": self._filtered,
+                }
+
+            return {
+                "pending": len(self._ring),
+                "filtered": self._filtered,
+                "sent": self._sent,
+                "enqueued": self._ring.enqueued,
+                "dropped": self._ring.dropped,
+                "dropped_by_level": dict(self._ring.dropped_by_level),
+                "capacity": self._ring.capacity,
+                "overflow_policy": self._ring.policy,
+                "spooled_bytes": self._spool.pending() if self._spool is not None else 0,
+            }
+
+    @staticmethod
+    def _tier(level: str, l_type: str) -> int:
+        lvl = level.upper() if isinstance(level, str) else ""
+        if lvl in _HIGH_LEVELS:
+            return _RecordRing.TIER_HIGH
+        if lvl in _LOW_LEVELS or l_type in _LOW_L_TYPES:
+            return _RecordRing.TIER_LOW
+        return _RecordRing.TIER_NORMAL
+
+    def _send_message(self, msg: bytes) -> None:
+        """Send a non-record message (event marker) after everything logged before it."""
+        with self._lock:
+            if self._ring is not None:
+                self._ring.push(_RecordRing.TIER_CONTROL, None, (None, msg))
+                self._ring_cond.notify()
+                return
+
+            # Event lines are assigned by the server, buffered records must arrive first.
+            self.flush()
+            self._sock.put(msg)
+
+    def _sender_thread(self, stop_flag: daemon.StopFlag) -> None:
+        while stop_flag.run():
+            with self._ring_cond:
+                if len(self._ring) == 0 and not (self._spool is not None and self._spool.pending() > 0):
+                    self._ring_cond.wait(0.1)
+
+            self._report_drops()
+
+            connected = self._sock.ok()
+            can_send = connected and self._sock.pending() < self.send_watermark
+
+            if self._spool is not None:
+                if self._spool_step(connected, can_send):
+                    continue
+
+            if not can_send:
+                time.sleep(0.01)
+                continue
+
+            with self._lock:
+                items = self._ring.pop(self.batch_max_records or 256)
+
+            for m in self._encode_items(items):
+                self._sock.put(m)
+
+            with self._lock:
+                self._sent += sum(1 for is_payload, _ in items if is_payload is not None)
+
+        if self._spool is not None:
+            self._spool.close()
+
+    def _spool_step(self, connected: bool, can_send: bool) -> bool:
+        """
+        Spill to / replay from the spool. Returns True if the ring must not be sent directly,
+        which is the case as long as older messages are still in the spool.
+        """
+        spool = self._spool
+
+        if spool.pending() > spool.backlog():
+            if not connected:
+                # Messages handed to the socket may not have left it, replay all uncommitted ones.
+                spool.rewind()
+            elif self._sock.pending() == 0:
+                # Replayed messages count as sent once the socket queue has taken them all.
+                replayed = spool.commit()
+                with self._lock:
+                    self._sent += replayed
+
+        with self._lock:
+            n_ring = len(self._ring)
+
+        spill = spool.backlog() > 0 or not connected or (not can_send and n_ring >= self.spool_watermark)
+
+        # A full spool leaves the records to the ring and its overflow policy.
+        if n_ring > 0 and spill and not spool.full():
+            with self._lock:
+                items = self._ring.pop(self.batch_max_records or 256)
+
+            spool.append(self._encode_items(items), sum(1 for is_payload, _ in items if is_payload is not None))
+
+        if spool.backlog() > 0:
+            if can_send:
+                for m in spool.read(256 * 1024):
+                    self._sock.put(m)
+            else:
+                time.sleep(0.01)
+            return True
+
+        if spool.pending() > 0:
+            time.sleep(0.005)
+            return True
+
+        return False
+
+    def _encode_items(self, items: list[tuple[bool | None, bytes]]) -> list[bytes]:
+        """
+        Consecutive record payloads become one batch message, markers (is_payload None) and
+        V1 fallbacks (complete messages) stay on their own.
+        """
+        encode_batch = encode_log_batch_v2 if self.proto == PROTO_V2 else encode_log_batch
+        out: list[bytes] = []
+        run: list[bytes] = []
+
+        for is_payload, data in items:
+            if is_payload:
+                run.append(data)
+                continue
+
+            if run:
+                out.append(encode_batch(run))
+                run = []
+            out.append(data)
+
+        if run:
+            out.append(encode_batch(run))
+
+        return out
+
+    def _report_drops(self) -> None:
+        now = time.monotonic()
+        if now - self._last_drop_report < self.drop_report_interval_s:
+            return
+
+        # While disconnected the report would only compete for ring space, the drops
+        # are accumulated into the first report after reconnecting.
+        if not self._sock.ok():
+            return
+        self._last_drop_report = now
+
+        with self._lock:
+            dropped = self._ring.dropped - self._reported_drops
+            if dropped <= 0:
+                return
+
+            by_level = {
+                k: v - self._reported_by_level.get(k, 0)
+                for k, v in self._ring.dropped_by_level.items()
+                if v != self._reported_by_level.get(k, 0)
+            }
+            self._reported_drops = self._ring.dropped
+            self._reported_by_level = dict(self._ring.dropped_by_level)
+
+        self.log(
+            f"{dropped} log records dropped",
+            level="WARN",
+            l_type="SW",
+            dropped=dropped,
+            dropped_by_level=by_level,
+            dropped_total=self._reported_drops,
+        )
+
+    def _encode_v2(self, record: dict[str, Any]) -> bytes | None:
+        origin = record["origin"]
+        try:
+            if origin["uuid"] == str(self._origin_uuid):
+                b_uuid = self._origin_uuid.bytes
+            else:
+                b_uuid = uuid.UUID(str(origin["uuid"])).bytes
 
-        self._sock.put(encode_log_record(record))
+            return encode_binary_record(
+                origin_uuid=b_uuid,
+                ts_ns=origin["ts_ns"],
+                seq=record["seq"],
+                level=record["level"],
+                l_type=record["l_type"],
+                msg=record["msg"],
+                data=record["data"],
+            )
+        except (ValueError, ProtocolError):
+            return None
 
     # ----- Event markers (no line numbers on the client) -----
 
@@ -95,7 +760,7 @@ class LogClient:
             "message": message,
             "data_start": data_start,
         }
-        self._sock.put(encode_event_begin(payload))
+        self._send_message(encode_event_begin(payload))
         return eid
 
     def end_event(self, event_id: str, **data_end: Any) -> None:
@@ -104,7 +769,7 @@ class LogClient:
             "event_id": str(event_id),
             "data_end": data_end,
         }
-        self._sock.put(encode_event_end(payload))
+        self._send_message(encode_event_end(payload))
 
     def end_last_event(self, *, e_type: str | None = None, **data_end: Any) -> None:
         """
@@ -114,7 +779,7 @@ class LogClient:
             **({"e_type": e_type} if e_type else {}),
             "data_end": data_end,
         }
-        self._sock.put(encode_event_end_last(payload))
+        self._send_message(encode_event_end_last(payload))
 
     @contextmanager
     def event(
@@ -0,0 +1,228 @@
+# src/ipi_ecs/logging/compression.py
+"""
+Compressed segments.
+
+A sealed segment <name>.ndjson can be rewritten as <name>.ndjson.blk: whole lines grouped into
+blocks of about BLOCK_BYTES, each compressed on its own, followed by a block table:
+
+    MAGIC | codec name (u8 length + ascii) | block 0 | block 1 | ...
+    table: n x (file offset u64, compressed length u32, raw start u64)
+    footer: table offset u64 | block count u32 | MAGIC
+
+records.offset of a compressed segment is (block << 32) | offset inside the block. A raw byte
+offset (< 2**32) is resolved through the raw starts of the table, so rows that are not rewritten
+yet still read correctly.
+"""
+from __future__ import annotations
+
+import bisect
+import lzma
+import os
+import struct
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable
+
+from ipi_ecs.logging.index import SQLiteIndex
+
+
+MAGIC = b"IPIBLK1\n"
+BLOCK_BYTES = 256 * 1024
+BLOCK_SUFFIX = ".blk"
+
+_OFFSET_SHIFT = 32
+_TABLE_ENTRY = struct.Struct("<QIQ")
+_FOOTER = struct.Struct("<QI")
+
+CODECS: dict[str, tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    "zlib": (lambda b: zlib.compress(b, 6), zlib.decompress),
+    "lzma": (lambda b: lzma.compress(b, preset=6), lzma.decompress),
+}
+
+
+def pack_offset(block: int, intra: int) -> int:
+    return (int(block) << _OFFSET_SHIFT) | int(intra)
+
+
+def is_packed_offset(offset: int) -> bool:
+    return int(offset) >= 1 << _OFFSET_SHIFT
+
+
+def compressed_path(segment_path: Path) -> Path:
+    return segment_path.with_name(segment_path.name + BLOCK_SUFFIX)
+
+
+def write_block_file(src: Path, dst: Path, codec: str, block_bytes: int = BLOCK_BYTES) -> list[int]:
+    """Compress the NDJSON file src into the block file dst. Returns the raw start offset of every block."""
+    compress = CODECS[codec][0]
+    name = codec.encode("ascii")
+
+    table: list[tuple[int, int, int]] = []
+    tmp = dst.with_name(dst.name + ".tmp")
+    with src.open("rb") as fin, tmp.open("wb") as fout:
+        fout.write(MAGIC + bytes([len(name)]) + name)
+
+        raw_start = 0
+        while True:
+            # Blocks end on a line boundary, a line longer than block_bytes gets a block of its own.
+            buf = fin.read(block_bytes)
+            if not buf:
+                break
+            if not buf.endswith(b"\n"):
+                buf += fin.readline()
+
+            data = compress(buf)
+            table.append((fout.tell(), len(data), raw_start))
+            fout.write(data)
+            raw_start += len(buf)
+
+        table_off = fout.tell()
+        for entry in table:
+            fout.write(_TABLE_ENTRY.pack(*entry))
+        fout.write(_FOOTER.pack(table_off, len(table)) + MAGIC)
+
+        fout.flush()
+        os.fsync(fout.fileno())
+
+    os.replace(tmp, dst)
+    return [raw for _, _, raw in table]
+
+
+class BlockFile:
+    """Block table of one compressed segment; read_block() returns a decompressed block."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        with path.open("rb") as f:
+            head = f.read(len(MAGIC) + 1)
+            if head[: len(MAGIC)] != MAGIC:
+                raise ValueError(f"Not a compressed segment: {path}")
+            self.codec = f.read(head[-1]).decode("ascii")
+
+            f.seek(-(_FOOTER.size + len(MAGIC)), os.SEEK_END)
+            table_off, n = _FOOTER.unpack(f.read(_FOOTER.size))
+            f.seek(table_off)
+            table = f.read(n * _TABLE_ENTRY.size)
+
+        self._decompress = CODECS[self.codec][1]
+        self.blocks = [_TABLE_ENTRY.unpack_from(table, i * _TABLE_ENTRY.size) for i in range(n)]
+        self.raw_starts = [raw for _, _, raw in self.blocks]
+
+    def locate(self, offset: int) -> tuple[int, int]:
+        """(block, offset inside the block) for a packed or a raw record offset."""
+        if offset >> _OFFSET_SHIFT:
+            return offset >> _OFFSET_SHIFT, offset & ((1 << _OFFSET_SHIFT) - 1)
+
+        block = bisect.bisect_right(self.raw_starts, offset) - 1
+        return block, offset - self.raw_starts[block]
+
+    def read_block(self, block: int) -> bytes:
+        file_off, length, _ = self.blocks[block]
+        with self.path.open("rb") as f:
+            f.seek(file_off)
+            return self._decompress(f.read(length))
+
+
+class BlockCache:
+    """LRU cache of decompressed blocks, so reading neighbouring lines decompresses a block once."""
+
+    def __init__(self, max_blocks: int = 32):
+        self.max_blocks = max_blocks
+        self._files: dict[Path, BlockFile] = {}
+        self._blocks: OrderedDict[tuple[Path, int], bytes] = OrderedDict()
+
+    def read_line(self, path: Path, offset: int) -> bytes:
+        bf = self._files.get(path)
+        if bf is None:
+            bf = BlockFile(path)
+            self._files[path] = bf
+
+        block, intra = bf.locate(int(offset))
+        key = (path, block)
+        data = self._blocks.get(key)
+        if data is None:
+            data = bf.read_block(block)
+            self._blocks[key] = data
+            while len(self._blocks) > self.max_blocks:
+                self._blocks.popitem(last=False)
+        else:
+            self._blocks.move_to_end(key)
+
+        end = data.find(b"\n", intra)
+        return data[intra:] if end < 0 else data[intra : end + 1]
+
+
+def compress_segment(
+    root: Path,
+    index: SQLiteIndex,
+    segment: dict[str, Any],
+    codec: str,
+    *,
+    block_bytes: int = BLOCK_BYTES,
+    rows_per_commit: int = 50_000,
+) -> bool:
+    """
+    Replace a sealed segment by its compressed form and rewrite the offsets of its records.
+
+    The codec is committed first (readers switch to the block file, raw offsets still resolve),
+    offsets are then rewritten in small transactions so a running writer is not blocked, and the
+    NDJSON file is removed last. Returns False if the segment was skipped.
+    """
+    if codec not in CODECS:
+        raise ValueError(f"Unknown codec: {codec}")
+
+    src = root / segment["path"]
+    dst = compressed_path(src)
+    if segment.get("codec"):
+        # Finish an interrupted run; the NDJSON file is only removed once everything is done.
+        if not src.exists() or not dst.exists():
+            return False
+        raw_starts = BlockFile(dst).raw_starts
+    else:
+        if not src.exists() or src.stat().st_size >> _OFFSET_SHIFT:
+            # Raw offsets of segments over 4 GiB would collide with packed ones.
+            return False
+        raw_starts = write_block_file(src, dst, codec, block_bytes)
+        index.set_segment_codec(path=segment["path"], codec=codec)
+
+    rows = index.get_segment_offsets(
+        segment["path"],
+        line_min=int(segment["start_line"]),
+        line_max=segment.get("end_line"),
+        offset_max=1 << _OFFSET_SHIFT,
+    )
+
+    updates = []
+    for r in rows:
+        offset = int(r["offset"])
+        block = bisect.bisect_right(raw_starts, offset) - 1
+        if block > 0:
+            updates.append((pack_offset(block, offset - raw_starts[block]), int(r["line"])))
+
+    for i in range(0, len(updates), rows_per_commit):
+        index.set_offsets(updates[i : i + rows_per_commit])
+
+    src.unlink()
+    return True
+
+
+def compress_archive(root: Path, codec: str, *, include_last: bool = False, block_bytes: int = BLOCK_BYTES) -> list[str]:
+    """
+    Compress every uncompressed segment of an archive index. The last segment may still be
+    written by a running logger and is skipped unless include_last is set.
+    Returns the names of the compressed segments.
+    """
+    index = SQLiteIndex(root / "index.sqlite3")
+    try:
+        segments = index.list_segments()
+        if segments and not include_last:
+            segments = segments[:-1]
+
+        done = []
+        for seg in segments:
+            if compress_segment(root, index, seg, codec, block_bytes=block_bytes):
+                done.append(seg["path"])
+        return done
+    finally:
+        index.close()
@@ -1,44 +1,180 @@
 # src/ipi_ecs/logging/db_reader.py
 from __future__ import annotations
 
+import heapq
 import json
 from pathlib import Path
 from typing import Any, Iterable
 
-from ipi_ecs.logging.index import SQLiteIndex
+from ipi_ecs.logging.compression import BlockCache, compressed_path, is_packed_offset
+from ipi_ecs.logging.index import SQLiteIndex, archive_index_dirs
+from ipi_ecs.logging.line_index import LineIndex, sidecar_path
+
+
+class _SegmentSource:
+    """
+    One segment opened by a query (plain file, or block file when fp is None). Rows without an
+    offset (sparse index) are found through the .idx sidecar; a row following the previous one
+    continues where that line ended, so line-range reads do not look up every line.
+    """
+
+    def __init__(self, path: Path, fp: Any, blocks: BlockCache):
+        self.path = path
+        self._fp = fp
+        self._blocks = blocks
+        self._block_path = compressed_path(path)
+        self._lines: LineIndex | None = None
+        self._next: tuple[int, int] | None = None
+
+    def close(self) -> None:
+        if self._fp is not None:
+            self._fp.close()
+        if self._lines is not None:
+            self._lines.close()
+
+    def _read_at(self, offset: int) -> bytes:
+        if self._fp is None:
+            return self._blocks.read_line(self._block_path, offset)
+        self._fp.seek(offset)
+        return self._fp.readline()
+
+    def _find(self, line: int) -> int:
+        if self._next is not None and self._next[0] == line:
+            return self._next[1]
+
+        if self._lines is None:
+            self._lines = LineIndex(sidecar_path(self.path))
+        found = self._lines.lookup(line)
+        if found is None:
+            raise KeyError(f"Line {line} is not in the line index of {self.path.name}")
+
+        first_line, offset = found
+        for _ in range(line - first_line):
+            offset += len(self._read_at(offset))
+        return offset
+
+    def read(self, line: int, offset: int) -> bytes:
+        if offset < 0:
+            offset = self._find(line)
+
+        raw = self._read_at(offset)
+        self._next = None if is_packed_offset(offset) else (line + 1, offset + len(raw))
+        return raw
+
 
 class DBJournalReader:
+    """
+    Reads records of one archive through its SQLite index. Archives written by a sharded logger
+    keep records in several sub-indexes (see archive_index_dirs); queries run on each of them and
+    the results are merged, so callers see one archive. Compressed segments are read a block at
+    a time through an LRU block cache.
+    """
     def __init__(self, root: Path):
         self.root = root
         self.index = SQLiteIndex(root / "index.sqlite3")
+        self._parts: dict[Path, SQLiteIndex] = {Path(root): self.index}
+        self._blocks = BlockCache()
 
     def close(self) -> None:
-        self.index.close()
+        for idx in self._parts.values():
+            idx.close()
+
+    def _refresh_parts(self) -> list[tuple[Path, SQLiteIndex]]:
+        # Shards appear when a sharded logger starts writing into this archive.
+        for d in archive_index_dirs(self.root):
+            if d not in self._parts:
+                self._parts[d] = SQLiteIndex(d / "index.sqlite3")
+        return list(self._parts.items())
+
+    @staticmethod
+    def _serving_parts(parts: list[tuple[Path, SQLiteIndex]], kwargs: dict[str, Any]) -> list[tuple[Path, SQLiteIndex]]:
+        """
+        Parts holding the optional indexes a text / field filter needs. The others (e.g. the
+        record-less top-level index of a sharded archive) are skipped; if no part has them, all
+        are queried so the error surfaces.
+        """
+        paths = {f[0] for f in kwargs.get("field_filters") or ()}
+        if not kwargs.get("text") and not paths:
+            return parts
+
+        serving = [
+            (root, idx) for root, idx in parts
+            if (idx.full_text or not kwargs.get("text")) and paths <= set(idx.get_index_fields())
+        ]
+        return serving or parts
+
+    def get_next_line(self) -> int:
+        return max(idx.get_next_line() for _, idx in self._refresh_parts())
+
+    def query_rows(self, **kwargs) -> list[tuple[Path, Any]]:
+        """SQLiteIndex.query_lines() over all parts, as (part dir, row) in the requested order."""
+        parts = self._serving_parts(self._refresh_parts(), kwargs)
+        if len(parts) == 1:
+            root, idx = parts[0]
+            return [(root, r) for r in idx.query_lines(**kwargs)]
+
+        order_by = kwargs.get("order_by", "line")
+        order_col = order_by if order_by in {"line", "ts_ns", "level_num"} else "line"
+        descending = bool(kwargs.get("descending", False))
+        limit = kwargs.get("limit")
+
+        # Each part is already sorted (and limited), merge and cut to the overall limit.
+        per_part = [[(root, r) for r in idx.query_lines(**kwargs)] for root, idx in parts]
+        merged = heapq.merge(*per_part, key=lambda x: (x[1][order_col], x[1]["line"]), reverse=descending)
+
+        out = []
+        for item in merged:
+            out.append(item)
+            if limit is not None and len(out) >= limit:
+                break
+        return out
+
+    def histogram(self, **kwargs) -> list[tuple[int, tuple[Any, ...], int]]:
+        """SQLiteIndex.histogram() summed over all parts, as (minute, group values, count) ordered by minute."""
+        counts: dict[tuple[Any, ...], int] = {}
+        for _, idx in self._refresh_parts():
+            for r in idx.histogram(**kwargs):
+                key = tuple(r)[:-1]
+                counts[key] = counts.get(key, 0) + int(r["n"])
+
+        # Group values may be NULL (no subsystem), keep those sortable next to strings.
+        keys = sorted(counts, key=lambda k: [(v is None, 0 if v is None else v) for v in k])
+        return [(k[0], k[1:], counts[k]) for k in keys]
 
     def read_line(self, line: int) -> dict[str, Any] | None:
-        rows = self.index.query_lines(line_min=line, line_max=line+1, limit=1)
+        rows = self.query(line_min=line, line_max=line+1, limit=1)
         if not rows:
             return None
-        _, seg, off = rows[0]
-        p = self.root / seg
-        with p.open("rb") as f:
-            f.seek(off)
-            raw = f.readline()
-        return json.loads(raw.decode("utf-8"))
+        return rows[0][1]
 
     def query(
         self,
         **kwargs,
     ) -> list[tuple[int, dict[str, Any]]]:
-        rows = self.index.query_lines(**kwargs)
-        out: list[dict[str, Any]] = []
-        # group by segment to reduce open/close churn (optional optimization later)
-        for line, seg, off, ts_ns, level, level_num, uuid, l_type in rows:
-            p = self.root / seg
-            with p.open("rb") as f:
-                f.seek(off)
-                raw = f.readline()
-            out.append((line, json.loads(raw.decode("utf-8"))))
+        rows = self.query_rows(**kwargs)
+        out: list[tuple[int, dict[str, Any]]] = []
+        sources: dict[Path, _SegmentSource] = {}
+        try:
+            for root, r in rows:
+                p = root / r["segment_path"]
+                src = sources.get(p)
+                if src is None:
+                    # Codec is looked up after the rows: offsets of rows read before a segment was
+                    # compressed are raw, and the block file resolves those as well.
+                    fp = None
+                    if not self._parts[root].get_segment_codec(r["segment_path"]):
+                        try:
+                            fp = p.open("rb")
+                        except FileNotFoundError:
+                            pass
+                    src = _SegmentSource(p, fp, self._blocks)
+                    sources[p] = src
+
+                raw = src.read(int(r["line"]), int(r["offset"]))
+                out.append((r["line"], json.loads(raw.decode("utf-8"))))
+        finally:
+            for src in sources.values():
+                src.close()
         return out
 
     # ----------------------
@@ -17,6 +17,21 @@ DEFAULT_LEVEL_MAP = {
     "CRITICAL": 50,
 }
 
+RECORDS_TABLE = """
+CREATE TABLE IF NOT EXISTS records (
+    line INTEGER PRIMARY KEY,
+    ts_ns INTEGER NOT NULL,
+    ingest_ts_ns INTEGER NOT NULL,
+    level_num INTEGER NOT NULL,
+    level_id INTEGER NOT NULL,
+    uuid_id INTEGER,
+    l_type_id INTEGER,
+    segment_id INTEGER NOT NULL REFERENCES dim_segment(id),
+    offset INTEGER NOT NULL,
+    subsystem_id INTEGER
+);
+"""
+
 DDL = """
 PRAGMA journal_mode=WAL;
 PRAGMA synchronous=NORMAL;
@@ -31,28 +46,42 @@ CREATE TABLE IF NOT EXISTS segments (
     start_line INTEGER NOT NULL,
     end_line INTEGER,
     start_ts_ns INTEGER NOT NULL,
-    end_ts_ns INTEGER
+    end_ts_ns INTEGER,
+    codec TEXT
 );
 
 CREATE INDEX IF NOT EXISTS idx_segments_start_line ON segments(start_line);
 CREATE INDEX IF NOT EXISTS idx_segments_end_line ON segments(end_line);
 
-CREATE TABLE IF NOT EXISTS records (
-    line INTEGER PRIMARY KEY,
-    ts_ns INTEGER NOT NULL,
-    ingest_ts_ns INTEGER NOT NULL,
+-- Repeated strings of records are interned into small dimension tables.
+CREATE TABLE IF NOT EXISTS dim_uuid (id INTEGER PRIMARY KEY, v TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS dim_l_type (id INTEGER PRIMARY KEY, v TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS dim_level (id INTEGER PRIMARY KEY, v TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS dim_segment (id INTEGER PRIMARY KEY, v TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS dim_subsystem (id INTEGER PRIMARY KEY, v TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS dim_field (id INTEGER PRIMARY KEY, v TEXT NOT NULL UNIQUE);
+
+-- Values of the indexed JSON paths of records (meta 'index_fields'), stored with their JSON type:
+-- numbers compare as numbers, strings as strings.
+CREATE TABLE IF NOT EXISTS record_fields (
+    key_id INTEGER NOT NULL REFERENCES dim_field(id),
+    value NOT NULL,
+    line INTEGER NOT NULL,
+    PRIMARY KEY (key_id, value, line)
+) WITHOUT ROWID;
+
+-- Record counts per minute of origin time, kept up to date by insert_records(). Missing ids are 0.
+CREATE TABLE IF NOT EXISTS rollup_minute (
+    minute INTEGER NOT NULL,
     level_num INTEGER NOT NULL,
-    level TEXT NOT NULL,
-    uuid TEXT,
-    l_type TEXT,
-    segment_path TEXT NOT NULL REFERENCES segments(path),
-    offset INTEGER NOT NULL
-);
+    l_type_id INTEGER NOT NULL,
+    uuid_id INTEGER NOT NULL,
+    subsystem_id INTEGER NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (minute, level_num, l_type_id, uuid_id, subsystem_id)
+) WITHOUT ROWID;
 
-CREATE INDEX IF NOT EXISTS idx_records_ts ON records(ts_ns);
-CREATE INDEX IF NOT EXISTS idx_records_levelnum ON records(level_num);
-CREATE INDEX IF NOT EXISTS idx_records_uuid ON records(uuid);
-CREATE INDEX IF NOT EXISTS idx_records_ltype ON records(l_type);
+""" + RECORDS_TABLE + """
 
 CREATE TABLE IF NOT EXISTS events (
     id TEXT PRIMARY KEY,
@@ -76,6 +105,75 @@ CREATE INDEX IF NOT EXISTS idx_events_end_line ON events(end_line);
 CREATE INDEX IF NOT EXISTS idx_events_updated ON events(updated_ns);
 """
 
+# Created after _migrate(). Every filter column is paired with line, so a filter plus a line range
+# or ORDER BY line is one index range scan. The single-column indexes they replace are dropped.
+RECORDS_INDEXES = """
+DROP INDEX IF EXISTS idx_records_ts;
+DROP INDEX IF EXISTS idx_records_levelnum;
+DROP INDEX IF EXISTS idx_records_uuid;
+DROP INDEX IF EXISTS idx_records_ltype;
+
+CREATE INDEX IF NOT EXISTS idx_records_ts_line ON records(ts_ns, line);
+CREATE INDEX IF NOT EXISTS idx_records_levelnum_line ON records(level_num, line);
+CREATE INDEX IF NOT EXISTS idx_records_uuid_line ON records(uuid_id, line);
+CREATE INDEX IF NOT EXISTS idx_records_ltype_line ON records(l_type_id, line);
+CREATE INDEX IF NOT EXISTS idx_records_subsystem_line ON records(subsystem_id, line);
+"""
+
+# Optional full-text index of msg and the string values of data; rowid is records.line.
+# Contentless with the trigram tokenizer: it matches substrings (case-insensitive) of 3+ characters.
+FULL_TEXT_TABLE = """
+CREATE VIRTUAL TABLE IF NOT EXISTS records_fts USING fts5(msg, data, content='', tokenize='trigram');
+"""
+FULL_TEXT_MIN_CHARS = 3
+
+FIELD_OPS = ("=", "<", "<=", ">", ">=")
+
+NS_PER_MINUTE = 60_000_000_000
+
+# histogram() group columns and the rollup_minute expression each one reads.
+HISTOGRAM_GROUPS = {"level": "r.level_num", "l_type": "t.v", "uuid": "u.v", "subsystem": "ss.v"}
+
+# min level from which filtering through idx_records_levelnum_line beats a scan in line order.
+PLAN_SELECTIVE_LEVEL_NUM = 30
+
+# TEXT columns of the old records table and the dimension tables they are interned into.
+_DIMS = {"uuid": "dim_uuid", "l_type": "dim_l_type", "level": "dim_level", "segment_path": "dim_segment"}
+_DIM_TABLES = (*_DIMS.values(), "dim_subsystem", "dim_field")
+
+# records joined with its dimension tables, rows keep the column names of the TEXT schema.
+# LEFT JOINs keep records the outer loop, so the index picked for it decides the plan.
+_RECORDS_JOINS = """
+    LEFT JOIN dim_segment s ON s.id = r.segment_id
+    LEFT JOIN dim_level lv ON lv.id = r.level_id
+    LEFT JOIN dim_uuid u ON u.id = r.uuid_id
+    LEFT JOIN dim_l_type t ON t.id = r.l_type_id
+    LEFT JOIN dim_subsystem ss ON ss.id = r.subsystem_id
+"""
+_RECORDS_COLUMNS = (
+    "r.line, s.v AS segment_path, r.offset, r.ts_ns, lv.v AS level, r.level_num, u.v AS uuid, t.v AS l_type, "
+    "ss.v AS subsystem"
+)
+
+
+SHARDS_DIR = "shards"
+
+
+def archive_index_dirs(archive_dir: Path) -> list[Path]:
+    """
+    Directories holding record indexes of an archive: the archive itself plus, for archives written
+    by a sharded logger, every <archive>/shards/<n>/ with an index. Events and the global next_line
+    always live in the archive's own index.
+    """
+    archive_dir = Path(archive_dir)
+    dirs = [archive_dir]
+
+    shards = archive_dir / SHARDS_DIR
+    if shards.is_dir():
+        dirs.extend(sorted(d for d in shards.iterdir() if (d / "index.sqlite3").exists()))
+
+    return dirs
+
 
 def _now_ns() -> int:
     return time.time_ns()
@@ -130,18 +228,133 @@ class SQLiteIndex:
         <segment>.jsonl (or similar)
     """
 
-    def __init__(self, db_path: Path):
+    def __init__(self, db_path: Path, *, check_same_thread: bool = True, synchronous: str | None = None):
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=check_same_thread)
         self.conn.row_factory = sqlite3.Row
         self.conn.execute("PRAGMA foreign_keys=ON")
         self.conn.executescript(DDL)
+        self._dim_ids: dict[str, dict[str, int]] = {table: {} for table in _DIM_TABLES}
+        self._migrate()
+        self.conn.executescript(RECORDS_INDEXES)
+        if synchronous is not None:
+            if synchronous.upper() not in ("OFF", "NORMAL", "FULL", "EXTRA"):
+                raise ValueError(f"Invalid synchronous setting: {synchronous}")
+            self.conn.execute(f"PRAGMA synchronous={synchronous.upper()}")
+        self.full_text = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='records_fts'"
+        ).fetchone() is not None
         self._ensure_next_line()
 
     def close(self) -> None:
         self.conn.close()
 
+    def _migrate(self) -> None:
+        # Indexes created before segments could be compressed have no codec column.
+        cols = {r["name"] for r in self.conn.execute("PRAGMA table_info(segments)")}
+        if "codec" not in cols:
+            self.conn.execute("ALTER TABLE segments ADD COLUMN codec TEXT")
+            self.conn.commit()
+
+        cols = {r["name"] for r in self.conn.execute("PRAGMA table_info(records)")}
+        if "segment_path" in cols:
+            self._migrate_interned_records()
+
+        cols = {r["name"] for r in self.conn.execute("PRAGMA table_info(records)")}
+        if "subsystem_id" not in cols:
+            # Records indexed before the column existed keep a NULL subsystem.
+            self.conn.execute("ALTER TABLE records ADD COLUMN subsystem_id INTEGER")
+            self.conn.commit()
+
+        if self.conn.execute("SELECT 1 FROM meta WHERE k='rollup_minute'").fetchone() is None:
+            self._backfill_rollups()
+
+    def _backfill_rollups(self) -> None:
+        """Fill rollup_minute from the records of an index created before it existed."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self.conn.execute("SELECT 1 FROM meta WHERE k='rollup_minute'").fetchone() is not None:
+                self.conn.rollback()
+                return
+
+            self.conn.execute(
+                f"""
+                INSERT INTO rollup_minute(minute,level_num,l_type_id,uuid_id,subsystem_id,n)
+                SELECT ts_ns / {NS_PER_MINUTE}, level_num, IFNULL(l_type_id, 0), IFNULL(uuid_id, 0),
+                       IFNULL(subsystem_id, 0), COUNT(*)
+                FROM records
+                GROUP BY 1, 2, 3, 4, 5
+                """
+            )
+            self.conn.execute("INSERT INTO meta(k,v) VALUES('rollup_minute','1')")
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+
+    def _migrate_interned_records(self) -> None:
+        """Rewrite a records table with TEXT uuid / l_type / level / segment_path to interned ids."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have migrated while this one waited for the lock.
+            cols = {r["name"] for r in self.conn.execute("PRAGMA table_info(records)")}
+            if "segment_path" not in cols:
+                self.conn.rollback()
+                return
+
+            print(f"Migrating {self.db_path} to interned record columns...")
+            for col, table in _DIMS.items():
+                self.conn.execute(f"INSERT OR IGNORE INTO {table}(v) SELECT DISTINCT {col} FROM records WHERE {col} IS NOT NULL")
+            self.conn.execute("INSERT OR IGNORE INTO dim_segment(v) SELECT path FROM segments")
+
+            self.conn.execute("ALTER TABLE records RENAME TO records_text")
+            self.conn.execute(RECORDS_TABLE)
+            self.conn.execute(
+                """
+                INSERT INTO records(line,ts_ns,ingest_ts_ns,level_num,level_id,uuid_id,l_type_id,segment_id,offset)
+                SELECT o.line, o.ts_ns, o.ingest_ts_ns, o.level_num, lv.id, u.id, t.id, s.id, o.offset
+                FROM records_text o
+                JOIN dim_segment s ON s.v = o.segment_path
+                JOIN dim_level lv ON lv.v = o.level
+                LEFT JOIN dim_uuid u ON u.v = o.uuid
+                LEFT JOIN dim_l_type t ON t.v = o.l_type
+                """
+            )
+            self.conn.execute("DROP TABLE records_text")
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
+        # Give the space of the TEXT columns back.
+        self.conn.execute("VACUUM")
+
+    def _dim_id(self, table: str, value: str | None, *, create: bool) -> int | None:
+        """
+        Id of value in a dimension table, cached per connection. With create=False an unknown
+        value gives None (readers never write), with create=True it is inserted (not committed).
+        """
+        if value is None:
+            return None
+
+        ids = self._dim_ids[table]
+        i = ids.get(value)
+        if i is not None:
+            return i
+
+        if create:
+            self.conn.execute(f"INSERT OR IGNORE INTO {table}(v) VALUES(?)", (value,))
+        row = self.conn.execute(f"SELECT id FROM {table} WHERE v=?", (value,)).fetchone()
+        if row is None:
+            return None
+
+        ids[value] = int(row["id"])
+        return ids[value]
+
+    def segment_id(self, path: str) -> int | None:
+        return self._dim_id("dim_segment", path, create=False)
+
     def _ensure_next_line(self) -> None:
         row = self.conn.execute("SELECT v FROM meta WHERE k='next_line'").fetchone()
         if row is None:
@@ -159,34 +372,65 @@ class SQLiteIndex:
             return 0
         return int(row["v"])
 
-    def set_next_line(self, next_line: int) -> None:
+    def set_next_line(self, next_line: int, *, commit: bool = True) -> None:
         self.conn.execute("INSERT INTO meta(k,v) VALUES('next_line',?) ON CONFLICT(k) DO UPDATE SET v=excluded.v", (str(int(next_line)),))
-        self.conn.commit()
+        if commit:
+            self.conn.commit()
+
+    def get_index_fields(self) -> list[str]:
+        """JSON paths (e.g. "data.shot") whose values new records put into record_fields."""
+        row = self.conn.execute("SELECT v FROM meta WHERE k='index_fields'").fetchone()
+        return json.loads(row["v"]) if row else []
+
+    def set_index_fields(self, paths: Iterable[str], *, commit: bool = True) -> None:
+        paths = list(dict.fromkeys(paths))
+        for p in paths:
+            if not p or any(not k for k in p.split(".")):
+                raise ValueError(f"Invalid field path: {p!r}")
+        self.conn.execute(
+            "INSERT INTO meta(k,v) VALUES('index_fields',?) ON CONFLICT(k) DO UPDATE SET v=excluded.v",
+            (_json_dumps(paths),),
+        )
+        if commit:
+            self.conn.commit()
 
     # -------------------------
     # Segments
     # -------------------------
 
-    def create_segment(self, *, path: str, start_line: int, start_ts_ns: int) -> None:
+    def create_segment(self, *, path: str, start_line: int, start_ts_ns: int, commit: bool = True) -> None:
+        self._dim_id("dim_segment", path, create=True)
         self.conn.execute(
             "INSERT OR REPLACE INTO segments(path,start_line,end_line,start_ts_ns,end_ts_ns) VALUES(?,?,?,?,NULL)",
             (path, int(start_line), None, int(start_ts_ns)),
         )
-        self.conn.commit()
+        if commit:
+            self.conn.commit()
 
-    def finalize_segment(self, *, path: str, end_line: int, end_ts_ns: int) -> None:
+    def finalize_segment(self, *, path: str, end_line: int, end_ts_ns: int, commit: bool = True) -> None:
         self.conn.execute(
             "UPDATE segments SET end_line=?, end_ts_ns=? WHERE path=?",
             (int(end_line), int(end_ts_ns), path),
         )
-        self.conn.commit()
+        if commit:
+            self.conn.commit()
 
     def list_segments(self) -> list[dict[str, Any]]:
         rows = self.conn.execute(
-            "SELECT path,start_line,end_line,start_ts_ns,end_ts_ns FROM segments ORDER BY start_line ASC"
+            "SELECT path,start_line,end_line,start_ts_ns,end_ts_ns,codec FROM segments ORDER BY start_line ASC"
         ).fetchall()
         return [dict(r) for r in rows]
 
+    def get_segment_codec(self, path: str) -> str | None:
+        """Codec of a compressed segment (see compression.py), None for plain NDJSON."""
+        row = self.conn.execute("SELECT codec FROM segments WHERE path=?", (path,)).fetchone()
+        return row["codec"] if row else None
+
+    def set_segment_codec(self, *, path: str, codec: str | None, commit: bool = True) -> None:
+        self.conn.execute("UPDATE segments SET codec=? WHERE path=?", (codec, path))
+        if commit:
+            self.conn.commit()
+
     def get_segment_for_line(self, line: int) -> dict[str, Any] | None:
         # end_line is exclusive; active segment may have NULL end_line
         row = self.conn.execute(
@@ -206,6 +450,30 @@ class SQLiteIndex:
     # Records
     # -------------------------
 
+    def get_last_record_in_segment(self, path: str) -> sqlite3.Row | None:
+        """line and offset of the last indexed record of a segment."""
+        return self.conn.execute(
+            "SELECT line, offset FROM records WHERE segment_id=? ORDER BY line DESC LIMIT 1",
+            (self.segment_id(path),),
+        ).fetchone()
+
+    def get_segment_offsets(self, path: str, *, line_min: int, line_max: int | None, offset_max: int) -> list[sqlite3.Row]:
+        """line and offset of the records of a segment in [line_min, line_max] with offset < offset_max."""
+        return self.conn.execute(
+            """
+            SELECT line, offset FROM records
+            WHERE line >= ? AND (? IS NULL OR line <= ?) AND segment_id=? AND offset < ?
+            ORDER BY line
+            """,
+            (int(line_min), line_max, line_max, self.segment_id(path), int(offset_max)),
+        ).fetchall()
+
+    def set_offsets(self, updates: Iterable[tuple[int, int]], *, commit: bool = True) -> None:
+        """Rewrite records.offset from (offset, line) pairs."""
+        self.conn.executemany("UPDATE records SET offset=? WHERE line=?", updates)
+        if commit:
+            self.conn.commit()
+
     def insert_record(
         self,
         *,
@@ -219,21 +487,172 @@ class SQLiteIndex:
         offset: int,
         level_map: dict[str, int] | None = None,
     ) -> None:
+        self.insert_records(
+            [
+                {
+                    "line": line,
+                    "ts_ns": ts_ns,
+                    "ingest_ts_ns": ingest_ts_ns,
+                    "level": level,
+                    "uuid": uuid,
+                    "l_type": l_type,
+                    "segment_path": segment_path,
+                    "offset": offset,
+                }
+            ],
+            level_map=level_map,
+        )
+
+    def enable_full_text(self) -> None:
+        """Create the full-text table; records inserted from now on with msg / data_text keys are added to it."""
+        self.conn.executescript(FULL_TEXT_TABLE)
+        self.full_text = True
+
+    def insert_records(self, rows: Iterable[dict[str, Any]], *, level_map: dict[str, int] | None = None) -> None:
+        """
+        Insert several record rows (same keys as insert_record's arguments) with one executemany.
+        Rows with "msg" (and optionally "data_text") also go into the full-text table if enabled,
+        "fields" ((path, value) pairs) into record_fields.
+        Does not commit.
+        """
         lm = level_map or DEFAULT_LEVEL_MAP
-        lvl = (level or "INFO").upper()
-        lvl_num = int(lm.get(lvl, 0))
+        dim = self._dim_id
+        params = []
+        text_params = []
+        field_params = []
+        for r in rows:
+            if self.full_text and "msg" in r:
+                text_params.append((int(r["line"]), r["msg"], r.get("data_text") or ""))
+            for path, value in r.get("fields") or ():
+                field_params.append((dim("dim_field", path, create=True), value, int(r["line"])))
+            lvl = (r["level"] or "INFO").upper()
+            params.append(
+                (
+                    int(r["line"]),
+                    int(r["ts_ns"]),
+                    int(r["ingest_ts_ns"]),
+                    int(lm.get(lvl, 0)),
+                    dim("dim_level", lvl, create=True),
+                    dim("dim_uuid", r["uuid"], create=True),
+                    dim("dim_l_type", r["l_type"], create=True),
+                    dim("dim_segment", r["segment_path"], create=True),
+                    int(r["offset"]),
+                    dim("dim_subsystem", r.get("subsystem"), create=True),
+                )
+            )
+
         try:
-            self.conn.execute(
+            self.conn.executemany(
                 """
-                INSERT INTO records(line,ts_ns,ingest_ts_ns,level_num,level,uuid,l_type,segment_path,offset)
-                VALUES(?,?,?,?,?,?,?,?,?)
+                INSERT INTO records(line,ts_ns,ingest_ts_ns,level_num,level_id,uuid_id,l_type_id,segment_id,offset,subsystem_id)
+                VALUES(?,?,?,?,?,?,?,?,?,?)
                 """,
-                (int(line), int(ts_ns), int(ingest_ts_ns), lvl_num, lvl, uuid, l_type, segment_path, int(offset)),
+                params,
             )
         except sqlite3.IntegrityError as e:
-            raise ValueError(f"Failed to insert log record at line {line}: {e}") from e
+            lines = f"{params[0][0]}..{params[-1][0]}" if params else "?"
+            raise ValueError(f"Failed to insert log records at lines {lines}: {e}") from e
+
+        if text_params:
+            self.conn.executemany("INSERT INTO records_fts(rowid,msg,data) VALUES(?,?,?)", text_params)
+        if field_params:
+            self.conn.executemany("INSERT INTO record_fields(key_id,value,line) VALUES(?,?,?)", field_params)
+
+        rollup: dict[tuple[int, ...], int] = {}
+        for p in params:
+            key = (p[1] // NS_PER_MINUTE, p[3], p[6] or 0, p[5] or 0, p[9] or 0)
+            rollup[key] = rollup.get(key, 0) + 1
+        self.conn.executemany(
+            """
+            INSERT INTO rollup_minute(minute,level_num,l_type_id,uuid_id,subsystem_id,n) VALUES(?,?,?,?,?,?)
+            ON CONFLICT(minute,level_num,l_type_id,uuid_id,subsystem_id) DO UPDATE SET n = n + excluded.n
+            """,
+            [(*k, n) for k, n in rollup.items()],
+        )
+
+    def query_lines(self, **kwargs) -> list[sqlite3.Row]:
+        """
+        Returns sqlite3.Row objects containing:
+          line, segment_path, offset, ts_ns, level, level_num, uuid, l_type, subsystem
 
-    def query_lines(
+        See _build_query_lines() for the filters.
+        """
+        sql, params = self._build_query_lines(**kwargs)
+        return list(self.conn.execute(sql, params).fetchall())
+
+    def explain_query_lines(self, **kwargs) -> list[str]:
+        """EXPLAIN QUERY PLAN of query_lines(**kwargs), one detail string per plan step."""
+        sql, params = self._build_query_lines(**kwargs)
+        return [r["detail"] for r in self.conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()]
+
+    @staticmethod
+    def _plan_index(
+        *,
+        has_line_set: bool,
+        has_uuid: bool,
+        has_subsystem: bool,
+        has_l_type: bool,
+        has_ts_range: bool,
+        has_line_range: bool,
+        min_level_num: int,
+        order_col: str,
+    ) -> str:
+        """
+        Pick the records index for a query_lines() filter combination (an INDEXED BY / NOT INDEXED
+        clause). Equality filters come first, they narrow to one (x, line) range; otherwise the
+        index follows the time range or the sort column; a scan of the line primary key is the
+        default and serves line ranges and ORDER BY line ... LIMIT n with row filters.
+        Text and field filters are driven by the lines they match, looked up by line (NOT INDEXED
+        still allows rowid lookups).
+        """
+        if has_line_set:
+            return "NOT INDEXED"
+        if has_uuid:
+            return "INDEXED BY idx_records_uuid_line"
+        if has_subsystem:
+            return "INDEXED BY idx_records_subsystem_line"
+        if has_l_type:
+            return "INDEXED BY idx_records_ltype_line"
+        if order_col == "ts_ns" or (has_ts_range and not has_line_range):
+            return "INDEXED BY idx_records_ts_line"
+        if order_col == "level_num" or min_level_num >= PLAN_SELECTIVE_LEVEL_NUM:
+            return "INDEXED BY idx_records_levelnum_line"
+        return "NOT INDEXED"
+
+    def _dim_filters(
+        self,
+        where: list[str],
+        params: list[Any],
+        *,
+        uuid: str | None,
+        subsystem: str | None,
+        l_type: str | None,
+        l_type_not: Iterable[str] | None,
+    ) -> None:
+        """
+        Append the dimension filters shared by records and rollup_minute (both aliased r) to
+        where / params. A value that was never interned matches nothing.
+        """
+        for col, table, value in (
+            ("uuid_id", "dim_uuid", uuid),
+            ("subsystem_id", "dim_subsystem", subsystem),
+            ("l_type_id", "dim_l_type", l_type),
+        ):
+            if value:
+                where.append(f"r.{col} = ?")
+                params.append(self._dim_id(table, value, create=False))
+
+        if l_type_not:
+            ids = [self._dim_id("dim_l_type", v, create=False) for v in l_type_not if v]
+            ids = [i for i in ids if i is not None]
+            if ids:
+                where.append(f"r.l_type_id NOT IN ({','.join(['?']*len(ids))})")
+                params.extend(ids)
+            else:
+                # Keep the NULL semantics of NOT IN on the TEXT column.
+                where.append("r.l_type_id IS NOT NULL")
+
+    def _build_query_lines(
         self,
         *,
         line_min: int | None = None,
@@ -241,78 +660,186 @@ class SQLiteIndex:
         ts_min_ns: int | None = None,
         ts_max_ns: int | None = None,
         uuid: str | None = None,
+        subsystem: str | None = None,
         l_type: str | None = None,
         l_type_not: Iterable[str] | None = None,
+        text: str | None = None,
+        field_filters: Iterable[tuple[str, str, Any]] | None = None,
         level: str | None = None,
         min_level: str | None = None,
         min_level_num: int | None = None,
         limit: int | None = None,
         order_by: str = "line",
         descending: bool = False,
-    ) -> list[sqlite3.Row]:
+    ) -> tuple[str, list[Any]]:
         """
-        Returns sqlite3.Row objects containing:
-          line, segment_path, offset, ts_ns, level, level_num, uuid, l_type
+        SQL and parameters of a query_lines() call.
+
+        uuid / subsystem / l_type / level filters are translated to dimension ids first; a value that was
+        never interned matches nothing.
+
+        text matches records whose msg or data string values contain it (case-insensitive); it
+        needs the full-text index (JournalWriter(full_text=True)) and at least FULL_TEXT_MIN_CHARS
+        characters, ValueError otherwise.
+
+        field_filters are (path, op, value) with op in FIELD_OPS on indexed JSON paths
+        (get_index_fields(), ValueError for others). A number only matches numbers, a string
+        only strings.
         """
         where: list[str] = []
         params: list[Any] = []
 
         if line_min is not None:
-            where.append("line >= ?")
+            where.append("r.line >= ?")
             params.append(int(line_min))
         if line_max is not None:
-            where.append("line < ?")
+            where.append("r.line < ?")
             params.append(int(line_max))
         if ts_min_ns is not None:
-            where.append("ts_ns >= ?")
+            where.append("r.ts_ns >= ?")
             params.append(int(ts_min_ns))
         if ts_max_ns is not None:
-            where.append("ts_ns < ?")
+            where.append("r.ts_ns < ?")
             params.append(int(ts_max_ns))
-        if uuid:
-            where.append("uuid = ?")
-            params.append(uuid)
-        if l_type:
-            where.append("l_type = ?")
-            params.append(l_type)
-
-        if l_type_not:
-            vals = [v for v in l_type_not if v]
-            if vals:
-                where.append(f"l_type NOT IN ({','.join(['?']*len(vals))})")
-                params.extend(vals)
+        self._dim_filters(where, params, uuid=uuid, subsystem=subsystem, l_type=l_type, l_type_not=l_type_not)
+
+        if text:
+            if not self.full_text:
+                raise ValueError(f"No full-text index in {self.db_path.parent}")
+            if len(text) < FULL_TEXT_MIN_CHARS:
+                raise ValueError(f"Text filter needs at least {FULL_TEXT_MIN_CHARS} characters")
+            # A quoted FTS5 string is one phrase; with the trigram tokenizer that is a substring match.
+            where.append("r.line IN (SELECT rowid FROM records_fts WHERE records_fts MATCH ?)")
+            params.append('"' + text.replace('"', '""') + '"')
+
+        field_filters = list(field_filters or ())
+        indexed = self.get_index_fields() if field_filters else []
+        for path, op, value in field_filters:
+            if path not in indexed:
+                raise ValueError(f"{path} is not an indexed field of {self.db_path.parent}")
+            if op not in FIELD_OPS:
+                raise ValueError(f"Invalid field operator: {op}")
+            # Numbers sort before all strings: bound ranges by '' so they stay within one type.
+            guard = ""
+            if op in (">", ">=") and not isinstance(value, str):
+                guard = " AND value < ''"
+            elif op in ("<", "<=") and isinstance(value, str):
+                guard = " AND value >= ''"
+            where.append(f"r.line IN (SELECT line FROM record_fields WHERE key_id = ? AND value {op} ?{guard})")
+            params.extend((self._dim_id("dim_field", path, create=False), value))
 
         if level:
-            lvl = level.upper()
-            where.append("level = ?")
-            params.append(lvl)
+            where.append("r.level_id = ?")
+            params.append(self._dim_id("dim_level", level.upper(), create=False))
 
+        level_floor = 0
         if min_level:
             lvl = min_level.upper()
             min_num = int(DEFAULT_LEVEL_MAP.get(lvl, 0))
-            where.append("level_num >= ?")
+            where.append("r.level_num >= ?")
             params.append(min_num)
+            level_floor = max(level_floor, min_num)
 
         if min_level_num:
-            where.append("level_num >= ?")
+            where.append("r.level_num >= ?")
             params.append(min_level_num)
+            level_floor = max(level_floor, int(min_level_num))
 
         where_sql = (" WHERE " + " AND ".join(where)) if where else ""
         order_col = order_by if order_by in {"line", "ts_ns", "level_num"} else "line"
         dir_sql = "DESC" if descending else "ASC"
 
+        # Ties are broken by line, the order DBJournalReader merges shards in.
+        order_sql = f"r.{order_col} {dir_sql}"
+        if order_col != "line":
+            order_sql += f", r.line {dir_sql}"
+
+        hint = self._plan_index(
+            has_line_set=bool(text) or bool(field_filters),
+            has_uuid=bool(uuid),
+            has_subsystem=bool(subsystem),
+            has_l_type=bool(l_type),
+            has_ts_range=ts_min_ns is not None or ts_max_ns is not None,
+            has_line_range=line_min is not None or line_max is not None,
+            min_level_num=level_floor,
+            order_col=order_col,
+        )
+
         sql = f"""
-            SELECT line, segment_path, offset, ts_ns, level, level_num, uuid, l_type
-            FROM records
+            SELECT {_RECORDS_COLUMNS}
+            FROM records r {hint}
+            {_RECORDS_JOINS}
             {where_sql}
-            ORDER BY {order_col} {dir_sql}
+            ORDER BY {order_sql}
         """
 
         if limit is not None:
             sql += " LIMIT ?"
             params.append(int(limit))
 
-        return list(self.conn.execute(sql, params).fetchall())
+        return sql, params
+
+    def histogram(
+        self,
+        *,
+        bucket_minutes: int = 1,
+        by: Iterable[str] = (),
+        ts_min_ns: int | None = None,
+        ts_max_ns: int | None = None,
+        uuid: str | None = None,
+        subsystem: str | None = None,
+        l_type: str | None = None,
+        l_type_not: Iterable[str] | None = None,
+        level: str | None = None,
+        min_level_num: int | None = None,
+    ) -> list[sqlite3.Row]:
+        """
+        Record counts from rollup_minute, as rows of (minute, <by columns>, n) ordered by minute;
+        minute is the first minute of a bucket_minutes wide bucket, "level" groups by level_num.
+
+        Filters are those of query_lines() that the rollups keep. The time range is widened to
+        whole minutes, and level matches by level number.
+        """
+        by = list(by)
+        for g in by:
+            if g not in HISTOGRAM_GROUPS:
+                raise ValueError(f"Cannot group a histogram by {g!r}")
+
+        where: list[str] = []
+        params: list[Any] = []
+
+        if ts_min_ns is not None:
+            where.append("r.minute >= ?")
+            params.append(int(ts_min_ns) // NS_PER_MINUTE)
+        if ts_max_ns is not None:
+            where.append("r.minute < ?")
+            params.append(-(-int(ts_max_ns) // NS_PER_MINUTE))
+        self._dim_filters(where, params, uuid=uuid, subsystem=subsystem, l_type=l_type, l_type_not=l_type_not)
+        if level:
+            where.append("r.level_num = ?")
+            params.append(int(DEFAULT_LEVEL_MAP.get(level.upper(), 0)))
+        if min_level_num:
+            where.append("r.level_num >= ?")
+            params.append(int(min_level_num))
+
+        width = max(1, int(bucket_minutes))
+        cols = "".join(f", {HISTOGRAM_GROUPS[g]} AS {g}" for g in by)
+        group = "".join(f", {g}" for g in by)
+        where_sql = (" WHERE " + " AND ".join(where)) if where else ""
+
+        return self.conn.execute(
+            f"""
+            SELECT (r.minute / {width}) * {width} AS minute{cols}, SUM(r.n) AS n
+            FROM rollup_minute r
+            LEFT JOIN dim_uuid u ON u.id = r.uuid_id
+            LEFT JOIN dim_l_type t ON t.id = r.l_type_id
+            LEFT JOIN dim_subsystem ss ON ss.id = r.subsystem_id
+            {where_sql}
+            GROUP BY 1{group}
+            ORDER BY 1{group}
+            """,
+            params,
+        ).fetchall()
 
     # -------------------------
     # Events
@@ -329,6 +856,7 @@ class SQLiteIndex:
         start_ts_ns: int,
         data_start: Any | None = None,
         level_map: dict[str, int] | None = None,
+        commit: bool = True,
     ) -> str:
         lm = level_map or DEFAULT_LEVEL_MAP
         lvl = (level or "INFO").upper()
@@ -353,7 +881,8 @@ class SQLiteIndex:
                 int(now),
             ),
         )
-        self.conn.commit()
+        if commit:
+            self.conn.commit()
         return event_id
 
     def end_event(
@@ -363,6 +892,7 @@ class SQLiteIndex:
         end_line: int,
         end_ts_ns: int,
         data_end: Any | None = None,
+        commit: bool = True,
     ) -> bool:
         now = _now_ns()
         cur = self.conn.execute(
@@ -379,7 +909,8 @@ class SQLiteIndex:
                 event_id,
             ),
         )
-        self.conn.commit()
+        if commit:
+            self.conn.commit()
         return cur.rowcount > 0
 
     def end_last_event(
@@ -389,6 +920,7 @@ class SQLiteIndex:
         end_line: int,
         end_ts_ns: int,
         data_end: Any | None = None,
+        commit: bool = True,
     ) -> str | None:
         params: list[Any] = []
         where = "end_line IS NULL"
@@ -402,7 +934,7 @@ class SQLiteIndex:
         if not row:
             return None
         event_id = row["id"]
-        self.end_event(event_id=event_id, end_line=end_line, end_ts_ns=end_ts_ns, data_end=data_end)
+        self.end_event(event_id=event_id, end_line=end_line, end_ts_ns=end_ts_ns, data_end=data_end, commit=commit)
         return event_id
 
     def get_event(self, event_id: str) -> EventRow | None:
@@ -2,17 +2,31 @@ from __future__ import annotations
 
 import json
 import os
+import queue
 import time
 import uuid
+import threading
 
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
+from typing import Any, NamedTuple
 
 from platformdirs import site_data_dir
+from ipi_ecs.logging.compression import CODECS, compress_segment
+from ipi_ecs.logging import line_index
 from ipi_ecs.logging.index import SQLiteIndex
 
 
+DURABILITY_NONE = "none"      # OS buffering, segments are flushed at each group commit
+DURABILITY_BATCH = "batch"    # flush + fsync of the segment before each group commit
+DURABILITY_STRICT = "strict"  # flush + fsync and index commit after every append
+
+DURABILITY_MODES = (DURABILITY_NONE, DURABILITY_BATCH, DURABILITY_STRICT)
+_SQLITE_SYNCHRONOUS = {DURABILITY_NONE: "OFF", DURABILITY_BATCH: "NORMAL", DURABILITY_STRICT: "FULL"}
+
+SEGMENT_BUFFER_BYTES = 1024 * 1024
+
+
 def resolve_log_dir(cli_log_dir: Path | None, env_var: str) -> Path:
     if cli_log_dir is not None:
         return cli_log_dir
@@ -32,6 +46,78 @@ class SegmentInfo:
     idx_path: str | None = None
 
 
+def _json_str(s: str) -> bytes:
+    return json.dumps(s, ensure_ascii=False).encode("utf-8")
+
+
+def record_subsystem(rec: dict[str, Any]) -> str | None:
+    """data["subsystem"] of a record (the name DDS subsystems log under), None if unset."""
+    data = rec.get("data")
+    s = data.get("subsystem") if isinstance(data, dict) else None
+    return s if isinstance(s, str) and s else None
+
+
+def record_text(rec: dict[str, Any]) -> dict[str, str]:
+    """msg and the top-level string values of data, the columns of the full-text index."""
+    data = rec.get("data")
+    values = data.values() if isinstance(data, dict) else ()
+    return {
+        "msg": rec.get("msg") if isinstance(rec.get("msg"), str) else "",
+        "data_text": "\n".join(v for v in values if isinstance(v, str)),
+    }
+
+
+def record_fields(rec: dict[str, Any], paths: list[str]) -> list[tuple[str, Any]]:
+    """(path, value) of every dotted path (e.g. "data.shot") that leads to a scalar in the record."""
+    out = []
+    for path in paths:
+        v: Any = rec
+        for key in path.split("."):
+            v = v.get(key) if isinstance(v, dict) else None
+        if isinstance(v, bool):
+            v = int(v)
+        if isinstance(v, (int, float, str)):
+            out.append((path, v))
+    return out
+
+
+class RawRecord(NamedTuple):
+    """
+    A record whose NDJSON line is already rendered, so the writer does not have to
+    re-serialize it. body is the JSON object without its closing brace; the writer
+    appends ingest_ts_ns. The other fields are what the index needs.
+    """
+    body: bytes
+    uuid: str
+    ts_ns: int
+    level: str
+    l_type: str
+    subsystem: str | None = None
+
+    @staticmethod
+    def from_fields(
+        *, uuid: str, ts_ns: int, seq: int, level: str, l_type: str, msg: str, data_json: bytes, subsystem: str | None = None
+    ) -> "RawRecord":
+        """
+        Render a schema v1 line from already decoded fields, splicing data_json in verbatim. data_json
+        must be a valid single-line JSON object, as decode_binary_record() guarantees.
+        """
+        if b"\n" in data_json or b"\r" in data_json:
+            raise ValueError("data_json must not contain line breaks")
+        body = b"".join(
+            (
+                b'{"v":1,"origin":{"uuid":', _json_str(uuid),
+                b',"ts_ns":', str(int(ts_ns)).encode("ascii"),
+                b'},"seq":', str(int(seq)).encode("ascii"),
+                b',"level":', _json_str(level),
+                b',"msg":', _json_str(msg),
+                b',"l_type":', _json_str(l_type),
+                b',"data":', data_json,
+            )
+        )
+        return RawRecord(body, uuid, int(ts_ns), level, l_type, subsystem)
+
+
 class JournalWriter:
     def __init__(
         self,
@@ -42,17 +128,71 @@ class JournalWriter:
         index_every_lines: int = 2000,
         session_id: str | None = None,
         service_name: str = "logger",
-        commit_interval_s: float = 5.0,
+        commit_interval_s: float = 0.25,
+        commit_max_records: int = 1000,
         segment_update_interval_s: float = 5.0,
+        auto_commit: bool = True,
+        durability: str = DURABILITY_BATCH,
+        line_allocator: Any = None,
+        event_index_path: Path | None = None,
+        compress: str | None = None,
+        sparse_index: bool = False,
+        full_text: bool = False,
+        index_fields: list[str] | None = None,
     ):
+        """
+        Index rows are group committed: they are buffered and written in one transaction (together
+        with next_line) every commit_max_records records or commit_interval_s seconds, whichever
+        comes first. Call maybe_commit() periodically so an idle writer still commits. Lines that were
+        written to a segment but whose index rows were lost in a crash are re-indexed on open.
+
+        durability selects none / batch / strict (see DURABILITY_*) and the matching SQLite
+        synchronous setting (OFF / NORMAL / FULL). Segment bytes always reach the OS before the index
+        rows pointing at them are committed.
+
+        line_allocator (with allocate(n) -> first line and peek() -> next free line) makes line numbers
+        come from a counter shared with other writers (sharded logger); each append_batch() takes one
+        contiguous block. event_index_path puts event markers into another (shared) index.
+
+        Every segment gets a <segment>.idx sidecar with the offset of every index_every_lines-th
+        record (see line_index.py). With sparse_index=True records.offset is not stored
+        (OFFSET_IN_SIDECAR) and readers find lines through the sidecar only.
+
+        compress ("zlib" / "lzma") recompresses sealed segments into block files on a background
+        thread (see compression.py). Segments left over by an earlier run are queued on open.
+
+        full_text=True adds msg and the string values of data to the index's full-text table
+        (query_lines(text=...)). index_fields sets the JSON paths of the archive whose scalar values
+        go into the index's record_fields table (query_lines(field_filters=...)); None keeps the
+        paths stored in the index. Pre-rendered records are parsed once more for either.
+
+        With auto_commit=False append_batch() never commits; the owner (IngestPipeline) calls commit()
+        from another thread. The writer is safe for one appending thread plus one committing thread.
+        """
         self.root = root
         self.root.mkdir(parents=True, exist_ok=True)
 
         self.rotate_max_bytes = rotate_max_bytes
         self.rotate_max_seconds = rotate_max_seconds
         self.index_every_lines = index_every_lines
+        if sparse_index and not index_every_lines > 0:
+            raise ValueError("sparse_index needs index_every_lines > 0")
+        self.sparse_index = sparse_index
+        self.full_text = full_text
 
         self.commit_interval_s = commit_interval_s
+        self.commit_max_records = commit_max_records
+        self.auto_commit = auto_commit
+
+        if compress is not None and compress not in CODECS:
+            raise ValueError(f"Unknown codec: {compress}")
+        self.compress = compress
+        self._compress_q: queue.Queue = queue.Queue()
+        self._compress_thread: threading.Thread | None = None
+
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Unknown durability mode: {durability}")
+        self.durability = durability
         self.segment_update_interval_s = segment_update_interval_s
         self._last_commit_mon = time.monotonic()
         self._last_seg_update_mon = time.monotonic()
@@ -63,21 +203,78 @@ class JournalWriter:
         self._manifest_path = self.root / "manifest.json"
         self._segments: list[SegmentInfo] = []
         self._global_line = 0
+        self._pending_rows: list[dict[str, Any]] = []
+
+        # _rows_lock guards _pending_rows, _index_lock serializes use of the SQLite connection.
+        self._rows_lock = threading.Lock()
+        self._index_lock = threading.RLock()
 
         self._active_fp = None
+        self._active_size = 0
         self._active_idx_fp = None
+        self._active_idx_count = 0
+        self._active_idx_next_line = -1
         self._active_started_ns = 0
         self._active_seg: SegmentInfo | None = None
 
-        self.index = SQLiteIndex(root / "index.sqlite3")
+        self.index = SQLiteIndex(
+            root / "index.sqlite3",
+            check_same_thread=auto_commit,
+            synchronous=_SQLITE_SYNCHRONOUS[durability],
+        )
+        if full_text:
+            self.index.enable_full_text()
+        if index_fields is not None:
+            self.index.set_index_fields(index_fields)
+        self.index_fields = self.index.get_index_fields()
+
+        self._line_allocator = line_allocator
+        self._event_index = None
+        if event_index_path is not None:
+            self._event_index = SQLiteIndex(event_index_path, check_same_thread=False)
         self._global_line = self.index.get_next_line()
         self._segments = self.index.list_segments()
 
+        self._recover_tail()
         self._open_new_segment()
 
+        if self.compress is not None:
+            for seg in self.index.list_segments():
+                if seg["path"] != self._active_name and (self.root / seg["path"]).exists():
+                    self._compress_q.put(seg["path"])
+
+            self._compress_thread = threading.Thread(target=self._compress_worker, name="segment-compress", daemon=True)
+            self._compress_thread.start()
+
     def close(self) -> None:
-        self._finalize_active_segment()
-        self.index.close()
+        with self._index_lock:
+            self._finalize_active_segment()
+            self.index.close()
+            if self._event_index is not None:
+                self._event_index.close()
+
+        if self._compress_thread is not None:
+            # The segment being compressed is finished, queued ones are picked up on the next open.
+            self._compress_q.put(None)
+            self._compress_thread.join()
+
+    def _compress_worker(self) -> None:
+        index = SQLiteIndex(self.root / "index.sqlite3")
+        try:
+            while True:
+                name = self._compress_q.get()
+                if name is None:
+                    break
+
+                seg = next((s for s in index.list_segments() if s["path"] == name), None)
+                if seg is None:
+                    continue
+                try:
+                    compress_segment(self.root, index, seg, self.compress)
+                except Exception as e:
+                    print(f"Compressing segment {name} failed: {e}")
+        finally:
+            index.close()
 
     def _segment_filename(self, seq: int, start_ns: int) -> str:
         t = time.strftime("%Y-%m-%dT%H%M%S", time.gmtime(start_ns / 1e9))
@@ -88,8 +285,9 @@ class JournalWriter:
             self._active_seg.end_line = self._global_line
             self._active_seg.end_ts_ns = time.time_ns()
 
-            self.index.finalize_segment(path=self._active_name, end_line=self._global_line, end_ts_ns=time.time_ns())
-            self.index.conn.commit()
+            with self._index_lock:
+                self.index.finalize_segment(path=self._active_name, end_line=self._global_line, end_ts_ns=time.time_ns(), commit=False)
+                self.commit()
 
         for fp in (self._active_fp, self._active_idx_fp):
             if fp is None:
@@ -108,20 +306,34 @@ class JournalWriter:
         self._active_seg = None
 
     def _open_new_segment(self) -> None:
+        # The committing thread flushes the active file, swap it under the index lock.
+        with self._index_lock:
+            self._open_new_segment_locked()
+
+    def _open_new_segment_locked(self) -> None:
+        sealed = self._active_name if self._active_seg is not None else None
         self._finalize_active_segment()
+        if sealed is not None and self.compress is not None:
+            self._compress_q.put(sealed)
 
         start_ns = time.time_ns()
         seq = len(self._segments) + 1
         name = self._segment_filename(seq, start_ns)
         path = self.root / name
 
-        self._active_fp = path.open("ab", buffering=0)
+        self._active_fp = path.open("ab", buffering=SEGMENT_BUFFER_BYTES)
+        # Offsets come from this count: tell() is not safe against a flush on the committing thread.
+        self._active_size = self._active_fp.tell()
         self._active_started_ns = start_ns
 
         idx_path = None
         if self.index_every_lines and self.index_every_lines > 0:
             idx_path = str(path.with_suffix(".idx").name)
-            self._active_idx_fp = (self.root / idx_path).open("ab", buffering=0)
+            self._active_idx_fp = (self.root / idx_path).open("ab")
+            if self._active_idx_fp.tell() == 0:
+                self._active_idx_fp.write(line_index.header(self.index_every_lines))
+        self._active_idx_count = 0
+        self._active_idx_next_line = -1
 
         seg = SegmentInfo(
             path=str(path.name),
@@ -135,15 +347,87 @@ class JournalWriter:
 
         self._active_name = path.name
         self.index.create_segment(path=self._active_name, start_line=self._global_line, start_ts_ns=start_ns)
+
+    def _recover_tail(self) -> None:
+        """
+        Re-index lines at the end of the last segment that were written but never committed to
+        the index (crash between a write and its group commit). A torn last line is cut off.
+        Rows are always committed before a new segment is opened, so only the last one can have a tail.
+        """
+        if not self._segments:
+            return
+
+        seg = self._segments[-1]
+        path = self.root / seg["path"]
+        if seg.get("codec") or not path.exists():
+            return
+
+        idx_path = line_index.sidecar_path(path)
+        last = self.index.get_last_record_in_segment(seg["path"])
+        with path.open("r+b") as fp:
+            if last is not None:
+                if int(last["offset"]) >= 0:
+                    fp.seek(int(last["offset"]))
+                else:
+                    # Sparse index, the offset is found through the sidecar.
+                    first_line, first_off = line_index.LineIndex(idx_path).lookup(int(last["line"]))
+                    fp.seek(first_off)
+                    for _ in range(int(last["line"]) - first_line):
+                        fp.readline()
+                fp.readline()
+            offset = fp.tell()
+            tail = fp.read()
+
+            end = tail.rfind(b"\n") + 1
+            if end < len(tail):
+                fp.truncate(offset + end)
+
+        # Recovered lines get explicit offsets in their rows, sidecar entries for the tail are dropped.
+        if tail and idx_path.exists():
+            line_index.truncate_from_offset(idx_path, offset)
+
+        if self._line_allocator is not None and end > 0:
+            # The old numbers may have been handed out again, recovered lines get fresh ones.
+            self._global_line = self._line_allocator.allocate(tail[:end].count(b"\n"))
+
+        rows = []
+        for raw in tail[:end].splitlines(keepends=True):
+            try:
+                rec = json.loads(raw)
+                origin = rec.get("origin") or {}
+            except (ValueError, AttributeError):
+                rec, origin = {}, {}
+
+            rows.append(
+                {
+                    "line": self._global_line,
+                    "uuid": origin.get("uuid") if isinstance(origin.get("uuid"), str) else "UNKNOWN",
+                    "ts_ns": int(origin.get("ts_ns") or 0),
+                    "ingest_ts_ns": int(rec.get("ingest_ts_ns") or 0),
+                    "l_type": rec.get("l_type") if isinstance(rec.get("l_type"), str) else "UNKNOWN",
+                    "level": rec.get("level") if isinstance(rec.get("level"), str) else "UNKNOWN",
+                    "subsystem": record_subsystem(rec) if isinstance(rec, dict) else None,
+                    "segment_path": seg["path"],
+                    "offset": offset,
+                    **(self._index_extras(rec) if isinstance(rec, dict) else {}),
+                }
+            )
+            offset += len(raw)
+            self._global_line += 1
+
+        if not rows and end == len(tail):
+            return
+
+        print(f"Recovered {len(rows)} unindexed line(s) at the end of {seg['path']}.")
+        self.index.insert_records(rows)
+        self.index.set_next_line(self._global_line, commit=False)
+        self.index.finalize_segment(path=seg["path"], end_line=self._global_line, end_ts_ns=time.time_ns(), commit=False)
         self.index.conn.commit()
 
-    def _should_rotate(self) -> bool:
+    def _should_rotate(self, pending_bytes: int = 0) -> bool:
         if self._active_fp is None:
             return True
-        try:
-            size = self._active_fp.tell()
-        except Exception:
-            size = 0
+        size = self._active_size + pending_bytes
         age_s = (time.time_ns() - self._active_started_ns) / 1e9
         return (size >= self.rotate_max_bytes) or (age_s >= self.rotate_max_seconds)
 
@@ -151,8 +435,18 @@ class JournalWriter:
 
     def next_line(self) -> int:
         """Return the next global line number that will be assigned to the next appended log record."""
+        if self._line_allocator is not None:
+            return int(self._line_allocator.peek())
         return int(self._global_line)
 
+    def _events(self) -> SQLiteIndex:
+        return self._event_index if self._event_index is not None else self.index
+
+    def _commit_events(self) -> None:
+        self.commit()
+        if self._event_index is not None:
+            self._event_index.conn.commit()
+
     def begin_event(
         self,
         *,
@@ -167,19 +461,20 @@ class JournalWriter:
 
         Commits immediately so a crash mid-experiment still leaves an OPEN event marker in the archive DB.
         """
-        start_line = int(self._global_line)
+        start_line = self.next_line()
         start_ts_ns = int(time.time_ns())
-        self.index.begin_event(
-            event_id=event_id,
-            e_type=e_type,
-            level=level,
-            message=message,
-            start_line=start_line,
-            start_ts_ns=start_ts_ns,
-            data_start=data_start,
-        )
-        self.index.conn.commit()
-        self._last_commit_mon = time.monotonic()
+        with self._index_lock:
+            self._events().begin_event(
+                event_id=event_id,
+                e_type=e_type,
+                level=level,
+                message=message,
+                start_line=start_line,
+                start_ts_ns=start_ts_ns,
+                data_start=data_start,
+                commit=False,
+            )
+            self._commit_events()
 
     def end_event(
         self,
@@ -193,22 +488,23 @@ class JournalWriter:
         end_line is (next_line - 1), clamped >= start_line. Commits immediately.
         """
         end_ts_ns = int(time.time_ns())
-        end_line = int(self._global_line) - 1
+        end_line = self.next_line() - 1
         if end_line < 0:
             end_line = 0
 
-        ev = self.index.get_event(event_id)
-        if ev and isinstance(ev.start_line, int):
-            end_line = max(end_line, int(ev.start_line))
-
-        updated = self.index.end_event(
-            event_id=event_id,
-            end_line=end_line,
-            end_ts_ns=end_ts_ns,
-            data_end=data_end,
-        )
-        self.index.conn.commit()
-        self._last_commit_mon = time.monotonic()
+        with self._index_lock:
+            ev = self._events().get_event(event_id)
+            if ev and isinstance(ev.start_line, int):
+                end_line = max(end_line, int(ev.start_line))
+
+            updated = self._events().end_event(
+                event_id=event_id,
+                end_line=end_line,
+                end_ts_ns=end_ts_ns,
+                data_end=data_end,
+                commit=False,
+            )
+            self._commit_events()
         return bool(updated)
 
     def end_last_event(
@@ -222,66 +518,148 @@ class JournalWriter:
         Commits immediately.
         """
         end_ts_ns = int(time.time_ns())
-        end_line = int(self._global_line) - 1
+        end_line = self.next_line() - 1
         if end_line < 0:
             end_line = 0
 
-        ended_id = self.index.end_last_event(
-            e_type=e_type,
-            end_line=end_line,
-            end_ts_ns=end_ts_ns,
-            data_end=data_end,
-        )
-        if ended_id is not None:
-            self.index.conn.commit()
-            self._last_commit_mon = time.monotonic()
+        with self._index_lock:
+            ended_id = self._events().end_last_event(
+                e_type=e_type,
+                end_line=end_line,
+                end_ts_ns=end_ts_ns,
+                data_end=data_end,
+                commit=False,
+            )
+            self._commit_events()
         return ended_id
 
-    def append(self, record: dict[str, Any]) -> int:
-        if self._active_fp is None or self._should_rotate():
-            self._open_new_segment()
-
-        rec = dict(record)
-        ingest_ts_ns = int(rec.get("ingest_ts_ns") or time.time_ns())
-        rec["ingest_ts_ns"] = ingest_ts_ns
-
-        origin = rec.get("origin") or {}
-        origin_uuid = origin.get("uuid") if isinstance(origin.get("uuid"), str) else "UNKNOWN"
-        origin_ts_ns = int(origin.get("ts_ns") or 0)
-
-        l_type = rec.get("l_type") if isinstance(rec.get("l_type"), str) else "UNKNOWN"
-        level = rec.get("level") if isinstance(rec.get("level"), str) else "UNKNOWN"
-
-        line_no = self._global_line
-
-        # byte offset BEFORE writing the line
-        byte_off = self._active_fp.tell()
-
-        b = json.dumps(rec, separators=(",", ":"), ensure_ascii=False).encode("utf-8") + b"\n"
-        self._active_fp.write(b)
-
-        # index row
-        self.index.insert_record(
-            line=line_no,
-            uuid=origin_uuid,
-            ts_ns=origin_ts_ns,
-            ingest_ts_ns=ingest_ts_ns,
-            l_type=l_type,
-            level=level,
-            segment_path=self._active_name,
-            offset=byte_off,
-        )
+    def append(self, record: dict[str, Any] | RawRecord) -> int:
+        return self.append_batch([record])[0]
 
-        self._global_line += 1
-        self.index.set_next_line(self._global_line)
+    def append_batch(self, records: list[dict[str, Any] | RawRecord]) -> list[int]:
+        """
+        Append records (dicts or pre-rendered RawRecords) in order. Lines are written with
+        one write per segment, their index rows go out with the next group commit.
 
+        Returns:
+            list[int]: Assigned global line numbers
+        """
+        if not records:
+            return []
+
+        rows: list[dict[str, Any]] = []
+        pending: list[bytes] = []
+        pending_idx: list[bytes] = []
+        pending_bytes = 0
+
+        if self._line_allocator is not None:
+            self._global_line = self._line_allocator.allocate(len(records))
+
+        for record in records:
+            if self._active_fp is None or self._should_rotate(pending_bytes):
+                self._write_pending(pending, pending_idx)
+                self._stage_rows(rows)
+                rows = []
+                pending = []
+                pending_idx = []
+                pending_bytes = 0
+                self._open_new_segment()
+
+            if isinstance(record, RawRecord):
+                ingest_ts_ns = time.time_ns()
+                origin_uuid = record.uuid
+                origin_ts_ns = record.ts_ns
+                l_type = record.l_type
+                level = record.level
+                subsystem = record.subsystem
+                extras = self._index_extras(json.loads(record.body + b"}")) if self.full_text or self.index_fields else None
+
+                b = record.body + b',"ingest_ts_ns":' + str(ingest_ts_ns).encode("ascii") + b"}\n"
+            else:
+                rec = dict(record)
+                ingest_ts_ns = int(rec.get("ingest_ts_ns") or time.time_ns())
+                rec["ingest_ts_ns"] = ingest_ts_ns
+
+                origin = rec.get("origin") or {}
+                origin_uuid = origin.get("uuid") if isinstance(origin.get("uuid"), str) else "UNKNOWN"
+                origin_ts_ns = int(origin.get("ts_ns") or 0)
+
+                l_type = rec.get("l_type") if isinstance(rec.get("l_type"), str) else "UNKNOWN"
+                level = rec.get("level") if isinstance(rec.get("level"), str) else "UNKNOWN"
+                subsystem = record_subsystem(rec)
+                extras = self._index_extras(rec) if self.full_text or self.index_fields else None
+
+                b = json.dumps(rec, separators=(",", ":"), ensure_ascii=False).encode("utf-8") + b"\n"
+
+            # byte offset BEFORE writing the line
+            byte_off = self._active_size + pending_bytes
+            pending.append(b)
+            pending_bytes += len(b)
+
+            if self._active_idx_fp is not None:
+                if self._active_idx_count % self.index_every_lines == 0 or self._global_line != self._active_idx_next_line:
+                    pending_idx.append(line_index.entry(self._global_line, byte_off))
+                self._active_idx_count += 1
+                self._active_idx_next_line = self._global_line + 1
+
+            rows.append(
+                {
+                    "line": self._global_line,
+                    "uuid": origin_uuid,
+                    "ts_ns": origin_ts_ns,
+                    "ingest_ts_ns": ingest_ts_ns,
+                    "l_type": l_type,
+                    "level": level,
+                    "subsystem": subsystem,
+                    "segment_path": self._active_name,
+                    "offset": line_index.OFFSET_IN_SIDECAR if self.sparse_index else byte_off,
+                    **(extras or {}),
+                }
+            )
+            self._global_line += 1
+
+        self._write_pending(pending, pending_idx)
+        self._stage_rows(rows)
+
+        if self.durability == DURABILITY_STRICT:
+            self.commit()
+
+        self._after_append()
+
+        return list(range(self._global_line - len(records), self._global_line))
+
+    def _index_extras(self, rec: dict[str, Any]) -> dict[str, Any]:
+        """Index row keys of the optional full-text and field indexes."""
+        out: dict[str, Any] = record_text(rec) if self.full_text else {}
+        if self.index_fields:
+            out["fields"] = record_fields(rec, self.index_fields)
+        return out
+
+    def _stage_rows(self, rows: list[dict[str, Any]]) -> None:
+        with self._rows_lock:
+            self._pending_rows.extend(rows)
+
+    def pending_rows(self) -> int:
+        """Number of appended records whose index rows are not committed yet."""
+        return len(self._pending_rows)
+
+    def _write_pending(self, pending: list[bytes], pending_idx: list[bytes]) -> None:
+        if pending:
+            data = b"".join(pending)
+            self._active_fp.write(data)
+            self._active_size += len(data)
+        if pending_idx:
+            self._active_idx_fp.write(b"".join(pending_idx))
+
+    def _after_append(self) -> None:
         # ---- periodic commit + segment progress ----
         now_mon = time.monotonic()
 
         # update the segments table so metadata stays current
         if (now_mon - self._last_seg_update_mon) >= self.segment_update_interval_s:
             # This is safe to call repeatedly; it’s just an UPDATE.
-            self.index.finalize_segment(path=self._active_name, end_line=self._global_line, end_ts_ns=time.time_ns())
+            with self._index_lock:
+                self.index.finalize_segment(path=self._active_name, end_line=self._global_line, end_ts_ns=time.time_ns(), commit=False)
             self._last_seg_update_mon = now_mon
 
             # Optional: flush file so “tailing” sees bytes quickly
@@ -290,9 +668,45 @@ class JournalWriter:
             except Exception:
                 pass
 
-        # commit at least every commit_interval_s, and also every N lines for throughput
-        if (now_mon - self._last_commit_mon) >= self.commit_interval_s or (self._global_line % 200 == 0):
-            self.index.conn.commit()
-            self._last_commit_mon = now_mon
+        if not self.auto_commit:
+            return
+
+        if len(self._pending_rows) >= self.commit_max_records:
+            self.commit()
+        else:
+            self.maybe_commit()
+
+    def maybe_commit(self) -> None:
+        """Group commit if commit_interval_s has passed since the last one."""
+        if (time.monotonic() - self._last_commit_mon) >= self.commit_interval_s:
+            self.commit()
+
+    def _sync_segment(self) -> None:
+        """Push written lines and sidecar entries to the OS (and to disk unless durability is none)."""
+        if self._active_fp is None:
+            return
+
+        for fp in (self._active_fp, self._active_idx_fp):
+            if fp is None:
+                continue
+            fp.flush()
+            if self.durability != DURABILITY_NONE:
+                os.fsync(fp.fileno())
+
+    def commit(self) -> None:
+        """Write buffered index rows and next_line, and commit everything staged in the index."""
+        with self._index_lock:
+            with self._rows_lock:
+                rows = self._pending_rows
+                self._pending_rows = []
 
-        return line_no
+            # Lines must be readable (durable) before the rows referencing them are.
+            if rows:
+                self._sync_segment()
+
+            if rows:
+                self.index.insert_records(rows)
+                self.index.set_next_line(rows[-1]["line"] + 1, commit=False)
+
+            self.index.conn.commit()
+            self._last_commit_mon = time.monotonic()
@@ -0,0 +1,118 @@
+# src/ipi_ecs/logging/line_index.py
+"""
+Sparse line -> byte offset sidecar of a segment (<segment>.idx).
+
+    header: MAGIC | stride u32
+    entries: (line u64, offset u64), ascending
+
+The writer adds an entry for every stride-th record of the segment and for every record whose
+line does not follow the previous one (line numbers leased by other shards). Between two entries
+lines are consecutive, so a line is found by a bisect over the entries plus a forward scan of at
+most stride lines. Offsets are raw NDJSON offsets, which compressed segments resolve as well.
+"""
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+from pathlib import Path
+
+MAGIC = b"IPIIDX1\n"
+_HEADER = struct.Struct("<8sI")
+_ENTRY = struct.Struct("<QQ")
+
+# records.offset of rows whose offset is only kept in the sidecar.
+OFFSET_IN_SIDECAR = -1
+
+
+def sidecar_path(segment_path: Path) -> Path:
+    return segment_path.with_suffix(".idx")
+
+
+def header(stride: int) -> bytes:
+    return _HEADER.pack(MAGIC, int(stride))
+
+
+def entry(line: int, offset: int) -> bytes:
+    return _ENTRY.pack(int(line), int(offset))
+
+
+def truncate_from_offset(path: Path, offset: int) -> None:
+    """Drop the entries pointing at offset or beyond (a segment tail that is rewritten)."""
+    with path.open("r+b") as f:
+        data = f.read()
+        if len(data) < _HEADER.size:
+            return
+
+        n = (len(data) - _HEADER.size) // _ENTRY.size
+        keep = n
+        while keep > 0 and _ENTRY.unpack_from(data, _HEADER.size + (keep - 1) * _ENTRY.size)[1] >= offset:
+            keep -= 1
+        f.truncate(_HEADER.size + keep * _ENTRY.size)
+
+
+class LineIndex:
+    """Memory-mapped reader of one sidecar. The map is renewed when an active segment grows."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.stride = 0
+        self._f = None
+        self._mm: mmap.mmap | None = None
+        self._n = 0
+        self._mapped_size = -1
+        self._map()
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+        if self._f is not None:
+            self._f.close()
+        self._mm = None
+        self._f = None
+
+    def _map(self) -> None:
+        self.close()
+        self._n = 0
+        if not self.path.exists():
+            return
+
+        self._f = self.path.open("rb")
+        size = os.fstat(self._f.fileno()).st_size
+        self._mapped_size = size
+        if size < _HEADER.size:
+            return
+
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.stride = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Not a line index: {self.path}")
+        self._n = (size - _HEADER.size) // _ENTRY.size
+
+    def _size(self) -> int:
+        try:
+            return self.path.stat().st_size
+        except FileNotFoundError:
+            return -1
+
+    def _entry(self, i: int) -> tuple[int, int]:
+        return _ENTRY.unpack_from(self._mm, _HEADER.size + i * _ENTRY.size)
+
+    def lookup(self, line: int) -> tuple[int, int] | None:
+        """(line, offset) of the last entry at or before line, None if there is none."""
+        # Entries may have been appended since the file was mapped.
+        stale = self._mm is None or self._n == 0 or self._entry(self._n - 1)[0] < line
+        if stale and self._size() != self._mapped_size:
+            self._map()
+        if self._mm is None or self._n == 0:
+            return None
+
+        lo, hi = 0, self._n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._entry(mid)[0] <= line:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        return self._entry(lo - 1) if lo > 0 else None
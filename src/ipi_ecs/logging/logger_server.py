@@ -1,50 +1,57 @@
 from __future__ import annotations
 
-import base64
 import queue
 import time
+import mt_events
 from pathlib import Path
 import traceback
-from typing import Any
+from typing import Any, Callable
 
 from ipi_ecs.core.daemon import StopFlag
 
 from ipi_ecs.core import tcp  # your wrapper should be here
-from ipi_ecs.logging.journal import JournalWriter, resolve_log_dir
-from ipi_ecs.logging.protocol import (
-    TYPE_LOG,
-    TYPE_EVT_BEGIN,
-    TYPE_EVT_END,
-    TYPE_EVT_END_LAST,
-    PROTO_V1,
-    ProtocolError,
-    decode_message,
-    decode_log_record,
-    decode_json_payload,
-)
+from ipi_ecs.logging.journal import DURABILITY_BATCH, JournalWriter, RawRecord, resolve_log_dir
+from ipi_ecs.logging.pipeline import IngestPipeline, decode_message_records, handle_marker
+from ipi_ecs.logging.protocol import encode_log_record
 
 ECS_LOG_PORT = 11751
 ENV_LOG_DIR = "IPI_ECS_LOG_DIR"
 
+# Upper bound on how long the idle loop sleeps before checking the stop flag / closed clients.
+IDLE_WAKEUP_S = 0.25
 
-def _wrap_unknown(payload: bytes, reason: str) -> dict[str, Any]:
-    return {
-        "v": 1,
-        "level": "WARN",
-        "msg": "Unparsed/unknown log payload",
-        "data": {"reason": reason, "raw_b64": base64.b64encode(payload).decode("ascii")},
-    }
 
+def _drain_client(writer: JournalWriter, c: Any) -> None:
+    """Ingest everything currently queued on one client connection."""
+    # Records queued on this connection are appended together (one index
+    # transaction). Event markers take their line from next_line(), so pending
+    # records are written before any marker is handled.
+    pending: list[dict[str, Any] | RawRecord] = []
+
+    while not c.empty():
+        msg = c.get(block=False)
+        if msg is None:
+            break
+
+        recs, marker = decode_message_records(msg)
+        pending.extend(recs)
+
+        if marker is not None:
+            writer.append_batch(pending)
+            pending = []
+            handle_marker(writer, *marker)
+
+    writer.append_batch(pending)
+
+
+def _forward_client(pipeline: IngestPipeline, c: Any) -> None:
+    while not c.empty():
+        msg = c.get(block=False)
+        if msg is None:
+            break
+
+        pipeline.put(msg)
 
-def _softw_warn(msg: str, *, data: dict[str, Any] | None = None) -> dict[str, Any]:
-    return {
-        "v": 1,
-        "l_type": "SOFTW",
-        "level": "WARNING",
-        "msg": msg,
-        "data": data or {},
-        "origin": {"uuid": "logger_server", "ts_ns": int(time.time_ns())},
-    }
 
 def _resolve_logger_archive_dir(cli_log_dir: Path | None) -> Path:
     """Resolve the archive directory the logger server should write into."""
@@ -59,6 +66,108 @@ def _resolve_logger_archive_dir(cli_log_dir: Path | None) -> Path:
     return root / "current"
 
 
+def _serve(
+    client_q: queue.Queue,
+    on_connected: mt_events.Event,
+    writer: JournalWriter,
+    running: Callable[[], bool],
+    *,
+    pipelined: bool,
+    stats_interval_s: float,
+) -> None:
+    """
+    Ingest from the client connections put into client_q while running() is true.
+
+    on_connected is called whenever a connection is put into client_q. The writer is not closed.
+    """
+    pipeline = None
+    if pipelined:
+        pipeline = IngestPipeline(writer)
+        pipeline.start()
+
+    last_stats = time.monotonic()
+    last_stats_records = 0
+
+    # Client sockets signal received messages and closing through mt_events, the loop
+    # sleeps on the consumer while idle and drains only the clients that have data.
+    consumer = mt_events.EventConsumer()
+    E_CONNECTED = -1
+    on_connected.bind(consumer, E_CONNECTED)
+
+    # Client n posts 2n on receive and 2n + 1 on close.
+    clients: dict[int, Any] = {}
+    next_id = 0
+    swept_below = 0
+    last_sweep = time.monotonic()
+
+    try:
+        while running() and (pipeline is None or pipeline.ok()):
+            e = consumer.get(timeout=IDLE_WAKEUP_S)
+
+            # Coalesce everything already signalled, a busy client posts one event per message.
+            ready: set[int] = set()
+            while e is not None:
+                ready.add(e)
+                e = consumer.get(block=False)
+
+            if E_CONNECTED in ready or not ready:
+                while not client_q.empty():
+                    c = client_q.get()
+                    c.on_receive().bind(consumer, 2 * next_id)
+                    c.on_close().bind(consumer, 2 * next_id + 1)
+                    clients[next_id] = c
+
+                    # Messages that arrived before the bind did not post an event.
+                    ready.add(2 * next_id)
+                    next_id += 1
+
+            # Neither did a close before the bind. TCPServer queues a handler before starting it, and
+            # is_closed() is true until then, so only clients bound before the previous sweep are checked.
+            if time.monotonic() - last_sweep >= IDLE_WAKEUP_S:
+                for n, c in clients.items():
+                    if n < swept_below and c.is_closed():
+                        ready.add(2 * n + 1)
+                swept_below = next_id
+                last_sweep = time.monotonic()
+
+            for e in sorted(ready):
+                c = clients.get(e // 2) if e >= 0 else None
+                if c is None:
+                    continue
+
+                if pipeline is not None:
+                    _forward_client(pipeline, c)
+                else:
+                    _drain_client(writer, c)
+
+                if e % 2 == 1:
+                    c.on_receive().unbind(consumer)
+                    c.on_close().unbind(consumer)
+                    del clients[e // 2]
+
+            if pipeline is None:
+                # Group commit of the index, also when no new records arrive.
+                writer.maybe_commit()
+            elif time.monotonic() - last_stats >= stats_interval_s:
+                stats = pipeline.get_stats(reset_max=True)
+                if stats["decode"]["records"] != last_stats_records:
+                    # The stats record passes the decode stage too, an idle server must not count it as traffic.
+                    last_stats_records = stats["decode"]["records"] + 1
+                    pipeline.put(encode_log_record({
+                        "v": 1,
+                        "l_type": "SOFTW",
+                        "level": "INFO",
+                        "msg": "Ingest pipeline stats",
+                        "data": stats,
+                        "origin": {"uuid": "logger_server", "ts_ns": int(time.time_ns())},
+                    }))
+                last_stats = time.monotonic()
+    finally:
+        on_connected.unbind(consumer)
+        if pipeline is not None:
+            pipeline.close()
+
+
 def run_logger_server(
     bind: tuple[str, int],
     log_dir: Path,
@@ -66,7 +175,29 @@ def run_logger_server(
     rotate_max_bytes: int = 256 * 1024 * 1024,
     rotate_max_seconds: int = 60 * 60,
     stop_flag: StopFlag | None = None,
+    pipelined: bool = True,
+    stats_interval_s: float = 60.0,
+    durability: str = DURABILITY_BATCH,
+    shards: int = 1,
+    compress: str | None = None,
+    sparse_index: bool = False,
+    full_text: bool = False,
+    index_fields: list[str] | None = None,
 ) -> None:
+    """
+    Run the log ingestion server until stop_flag is stopped (or KeyboardInterrupt).
+
+    With pipelined=True messages are handed to an IngestPipeline (decode, append and index on
+    separate threads) and its stage statistics are logged as a SOFTW record every stats_interval_s
+    while records are arriving. pipelined=False ingests on the server thread.
+    durability is passed to JournalWriter (none / batch / strict), as is compress (codec for
+    sealed segments, None keeps them as plain NDJSON), sparse_index (record offsets only in the
+    .idx sidecars), full_text (full-text index of msg and data strings) and index_fields (JSON
+    paths indexed in record_fields, None keeps the archive's).
+
+    shards > 1 runs that many worker processes, each writing its own sub-journal under
+    <archive>/shards/ and taking a share of the client connections (see sharding.py).
+    """
     addr, port = bind
     if port is None:
         port = ECS_LOG_PORT
@@ -77,6 +208,29 @@ def run_logger_server(
     
     print("Using log dir", log_dir)
     print("Using bind address", bind)
+
+    if shards > 1:
+        from ipi_ecs.logging.sharding import run_sharded_server
+
+        run_sharded_server(
+            bind,
+            log_dir,
+            shards,
+            stop_flag=stop_flag,
+            writer_opts={
+                "rotate_max_bytes": rotate_max_bytes,
+                "rotate_max_seconds": rotate_max_seconds,
+                "durability": durability,
+                "compress": compress,
+                "sparse_index": sparse_index,
+                "full_text": full_text,
+                "index_fields": index_fields,
+            },
+            pipelined=pipelined,
+            stats_interval_s=stats_interval_s,
+        )
+        return
+
     client_q: queue.Queue = queue.Queue()
     srv = tcp.TCPServer(bind, client_q)
     srv.start()
@@ -86,109 +240,23 @@ def run_logger_server(
         rotate_max_bytes=rotate_max_bytes,
         rotate_max_seconds=rotate_max_seconds,
         service_name="logger",
+        auto_commit=not pipelined,
+        durability=durability,
+        compress=compress,
+        sparse_index=sparse_index,
+        full_text=full_text,
+        index_fields=index_fields,
     )
 
-    clients: list[Any] = []
-
     try:
-        while srv.ok() and not (stop_flag is not None and not stop_flag.run()):
-            while not client_q.empty():
-                clients.append(client_q.get())
-
-            for c in list(clients):
-                if c.is_closed():
-                    clients.remove(c)
-                    continue
-
-                while not c.empty():
-                    msg = c.get(block=False)
-                    if msg is None:
-                        break
-
-                    try:
-                        msg_type, ver, payload = decode_message(msg)
-                    except ProtocolError:
-                        writer.append(_wrap_unknown(msg, "bad magic/header"))
-                        continue
-
-                    if ver != PROTO_V1:
-                        writer.append(_wrap_unknown(payload, f"unsupported ver {ver}"))
-                        continue
-
-                    if msg_type == TYPE_LOG:
-                        try:
-                            rec = decode_log_record(payload)
-                        except Exception as e:
-                            writer.append(_wrap_unknown(payload, f"json decode error: {e}"))
-                            continue
-
-                        writer.append(rec)
-                        continue
-
-                    if msg_type in (TYPE_EVT_BEGIN, TYPE_EVT_END, TYPE_EVT_END_LAST):
-                        try:
-                            obj = decode_json_payload(payload)
-                        except Exception as e:
-                            writer.append(_wrap_unknown(payload, f"event json decode error: {e}"))
-                            continue
-
-                        if msg_type == TYPE_EVT_BEGIN:
-                            event_id = obj.get("event_id")
-                            e_type = obj.get("e_type")
-                            level = obj.get("level")
-                            message = obj.get("message")
-                            data_start = obj.get("data_start") or obj.get("data") or {}
-
-                            if not (isinstance(event_id, str) and isinstance(e_type, str) and isinstance(level, str) and isinstance(message, str)):
-                                writer.append(_softw_warn("Bad EVT_BEGIN payload (missing fields).", data={"obj": obj}))
-                                continue
-
-                            try:
-                                writer.begin_event(
-                                    event_id=event_id,
-                                    e_type=e_type,
-                                    level=level,
-                                    message=message,
-                                    data_start=(data_start if isinstance(data_start, dict) else {}),
-                                )
-                            except Exception as e:
-                                writer.append(_softw_warn("Failed to begin event.", data={"error": str(e), "event_id": event_id}))
-                            continue
-
-                        if msg_type == TYPE_EVT_END:
-                            event_id = obj.get("event_id")
-                            data_end = obj.get("data_end") or obj.get("data") or {}
-
-                            if not isinstance(event_id, str):
-                                writer.append(_softw_warn("Bad EVT_END payload (missing event_id).", data={"obj": obj}))
-                                continue
-
-                            try:
-                                writer.end_event(
-                                    event_id=event_id,
-                                    data_end=(data_end if isinstance(data_end, dict) else {}),
-                                )
-                            except Exception as e:
-                                writer.append(_softw_warn("Failed to end event.", data={"error": str(e), "event_id": event_id}))
-                            continue
-
-                        # TYPE_EVT_END_LAST
-                        e_type = obj.get("e_type")
-                        data_end = obj.get("data_end") or obj.get("data") or {}
-
-                        try:
-                            writer.end_last_event(
-                                e_type=(e_type if isinstance(e_type, str) else None),
-                                data_end=(data_end if isinstance(data_end, dict) else {}),
-                            )
-                        except Exception as e:
-                            writer.append(_softw_warn("Failed to end last event.", data={"error": str(e), "e_type": e_type}))
-                        continue
-
-                    writer.append(_wrap_unknown(payload, f"unsupported type {msg_type}"))
-
-            time.sleep(0.01)
-
+        _serve(
+            client_q,
+            srv.on_connected(),
+            writer,
+            lambda: srv.ok() and not (stop_flag is not None and not stop_flag.run()),
+            pipelined=pipelined,
+            stats_interval_s=stats_interval_s,
+        )
     except KeyboardInterrupt:
         pass
     except Exception as e:
@@ -0,0 +1,384 @@
+from __future__ import annotations
+
+import base64
+import json
+import queue
+import re
+import threading
+import time
+import uuid
+from typing import Any
+
+from ipi_ecs.core import daemon
+from ipi_ecs.logging.journal import JournalWriter, RawRecord, record_subsystem
+from ipi_ecs.logging.protocol import (
+    TYPE_LOG,
+    TYPE_LOG_BATCH,
+    TYPE_EVT_BEGIN,
+    TYPE_EVT_END,
+    TYPE_EVT_END_LAST,
+    PROTO_V1,
+    PROTO_V2,
+    BinaryRecord,
+    ProtocolError,
+    decode_message,
+    decode_log_record,
+    decode_log_batch,
+    decode_binary_record,
+    decode_log_batch_v2,
+    decode_json_payload,
+    scan_log_records,
+)
+
+MARKER_TYPES = (TYPE_EVT_BEGIN, TYPE_EVT_END, TYPE_EVT_END_LAST)
+
+
+def _wrap_unknown(payload: bytes, reason: str) -> dict[str, Any]:
+    return {
+        "v": 1,
+        "level": "WARN",
+        "msg": "Unparsed/unknown log payload",
+        "data": {"reason": reason, "raw_b64": base64.b64encode(payload).decode("ascii")},
+    }
+
+
+def _softw_warn(msg: str, *, data: dict[str, Any] | None = None) -> dict[str, Any]:
+    return {
+        "v": 1,
+        "l_type": "SOFTW",
+        "level": "WARNING",
+        "msg": msg,
+        "data": data or {},
+        "origin": {"uuid": "logger_server", "ts_ns": int(time.time_ns())},
+    }
+
+# LogClient puts the subsystem first in data.
+_SUBSYSTEM_FIRST = re.compile(rb'\{"subsystem":"([^"\\]+)"[,}]')
+
+
+def _binary_subsystem(data_json: bytes) -> str | None:
+    m = _SUBSYSTEM_FIRST.match(data_json)
+    if m is not None:
+        return m.group(1).decode("utf-8")
+    if b'"subsystem"' not in data_json:
+        return None
+
+    try:
+        return record_subsystem({"data": json.loads(data_json)})
+    except ValueError:
+        return None
+
+
+def _raw_from_binary(rec: BinaryRecord) -> RawRecord:
+    return RawRecord.from_fields(
+        uuid=str(uuid.UUID(bytes=rec.origin_uuid)),
+        ts_ns=rec.ts_ns,
+        seq=rec.seq,
+        level=rec.level,
+        l_type=rec.l_type,
+        msg=rec.msg,
+        data_json=rec.data_json,
+        subsystem=_binary_subsystem(rec.data_json),
+    )
+
+
+def handle_marker(writer: JournalWriter, msg_type: int, payload: bytes) -> None:
+    """Apply an event marker (EVT_BEGIN / EVT_END / EVT_END_LAST) to the writer; bad payloads become WARN records."""
+    try:
+        obj = decode_json_payload(payload)
+    except Exception as e:
+        writer.append(_wrap_unknown(payload, f"event json decode error: {e}"))
+        return
+
+    if msg_type == TYPE_EVT_BEGIN:
+        event_id = obj.get("event_id")
+        e_type = obj.get("e_type")
+        level = obj.get("level")
+        message = obj.get("message")
+        data_start = obj.get("data_start") or obj.get("data") or {}
+
+        if not (isinstance(event_id, str) and isinstance(e_type, str) and isinstance(level, str) and isinstance(message, str)):
+            writer.append(_softw_warn("Bad EVT_BEGIN payload (missing fields).", data={"obj": obj}))
+            return
+
+        try:
+            writer.begin_event(
+                event_id=event_id,
+                e_type=e_type,
+                level=level,
+                message=message,
+                data_start=(data_start if isinstance(data_start, dict) else {}),
+            )
+        except Exception as e:
+            writer.append(_softw_warn("Failed to begin event.", data={"error": str(e), "event_id": event_id}))
+        return
+
+    if msg_type == TYPE_EVT_END:
+        event_id = obj.get("event_id")
+        data_end = obj.get("data_end") or obj.get("data") or {}
+
+        if not isinstance(event_id, str):
+            writer.append(_softw_warn("Bad EVT_END payload (missing event_id).", data={"obj": obj}))
+            return
+
+        try:
+            writer.end_event(
+                event_id=event_id,
+                data_end=(data_end if isinstance(data_end, dict) else {}),
+            )
+        except Exception as e:
+            writer.append(_softw_warn("Failed to end event.", data={"error": str(e), "event_id": event_id}))
+        return
+
+    # TYPE_EVT_END_LAST
+    e_type = obj.get("e_type")
+    data_end = obj.get("data_end") or obj.get("data") or {}
+
+    try:
+        writer.end_last_event(
+            e_type=(e_type if isinstance(e_type, str) else None),
+            data_end=(data_end if isinstance(data_end, dict) else {}),
+        )
+    except Exception as e:
+        writer.append(_softw_warn("Failed to end last event.", data={"error": str(e), "e_type": e_type}))
+
+
+def decode_message_records(msg: bytes) -> tuple[list[dict[str, Any] | RawRecord], tuple[int, bytes] | None]:
+    """
+    Decode one protocol message into records to append, or an event marker (msg_type, payload).
+    Undecodable messages become WARN records.
+    """
+    try:
+        msg_type, ver, payload = decode_message(msg)
+    except ProtocolError:
+        return [_wrap_unknown(msg, "bad magic/header")], None
+
+    if ver == PROTO_V2 and msg_type in (TYPE_LOG, TYPE_LOG_BATCH):
+        # Binary records are written without parsing the record as JSON, only data is validated.
+        try:
+            if msg_type == TYPE_LOG:
+                return [_raw_from_binary(decode_binary_record(payload))], None
+            return [_raw_from_binary(r) for r in decode_log_batch_v2(payload)], None
+        except ProtocolError as e:
+            return [_wrap_unknown(payload, f"binary decode error: {e}")], None
+
+    if ver != PROTO_V1:
+        return [_wrap_unknown(payload, f"unsupported ver {ver}")], None
+
+    if msg_type in (TYPE_LOG, TYPE_LOG_BATCH):
+        # LogClient records are written as received, with ingest_ts_ns spliced in by the writer.
+        scanned = scan_log_records(payload, batch=(msg_type == TYPE_LOG_BATCH))
+        if scanned is not None:
+            return [RawRecord(*r) for r in scanned], None
+
+    if msg_type == TYPE_LOG:
+        try:
+            return [decode_log_record(payload)], None
+        except Exception as e:
+            return [_wrap_unknown(payload, f"json decode error: {e}")], None
+
+    if msg_type == TYPE_LOG_BATCH:
+        try:
+            recs = decode_log_batch(payload)
+        except Exception as e:
+            return [_wrap_unknown(payload, f"batch decode error: {e}")], None
+
+        return [rec if isinstance(rec, dict) else _wrap_unknown(payload, "batch entry is not an object") for rec in recs], None
+
+    if msg_type in MARKER_TYPES:
+        return [], (msg_type, payload)
+
+    return [_wrap_unknown(payload, f"unsupported type {msg_type}")], None
+
+
+class _StageStats:
+    """Counters of one pipeline stage. Only written by the stage's own thread."""
+
+    def __init__(self):
+        self.items = 0
+        self.records = 0
+        self.latency_sum_s = 0.0
+        self.latency_max_s = 0.0
+
+    def add(self, records: int, latency_s: float) -> None:
+        self.items += 1
+        self.records += records
+        self.latency_sum_s += latency_s
+        self.latency_max_s = max(self.latency_max_s, latency_s)
+
+    def snapshot(self, depth: int, reset_max: bool) -> dict[str, Any]:
+        ret = {
+            "depth": depth,
+            "items": self.items,
+            "records": self.records,
+            "latency_avg_ms": (self.latency_sum_s / self.items * 1e3) if self.items else 0.0,
+            "latency_max_ms": self.latency_max_s * 1e3,
+        }
+        if reset_max:
+            self.latency_max_s = 0.0
+        return ret
+
+
+class IngestPipeline:
+    """
+    Three stage ingestion into a JournalWriter (created with auto_commit=False):
+
+      decode: protocol messages -> records / event markers
+      append: writes lines to the active segment, assigns line numbers and offsets, handles markers
+      index:  group commits the index rows the append stage staged in the writer
+
+    Stages are connected by bounded queues; the index stage is bounded by max_pending_rows. A slow
+    disk or index stalls its own stage first and reaches put() only once the queues in front are full.
+    decode / append latency is measured from put() to the end of the stage, index latency is the
+    duration of one group commit.
+    """
+
+    def __init__(
+        self,
+        writer: JournalWriter,
+        *,
+        decode_queue_size: int = 10000,
+        append_queue_size: int = 1000,
+        max_pending_rows: int = 100000,
+    ):
+        self.writer = writer
+        self.max_pending_rows = max_pending_rows
+
+        self._decode_q: queue.Queue = queue.Queue(maxsize=decode_queue_size)
+        self._append_q: queue.Queue = queue.Queue(maxsize=append_queue_size)
+
+        self._rows_cond = threading.Condition()
+        self._append_done = False
+        self._closing = False
+
+        self._stats = {"decode": _StageStats(), "append": _StageStats(), "index": _StageStats()}
+
+        self._daemon = daemon.Daemon()
+        self._daemon.add(self._decode_thread)
+        self._daemon.add(self._append_thread)
+        self._daemon.add(self._index_thread)
+
+    def start(self) -> None:
+        self._daemon.start()
+
+    def ok(self) -> bool:
+        return self._closing or self._daemon.is_ok()
+
+    def put(self, msg: bytes) -> None:
+        """Queue one protocol message. Blocks while the decode queue is full."""
+        self._decode_q.put((time.monotonic(), msg))
+
+    def close(self, timeout: float = 30.0) -> None:
+        """Process everything queued, commit and stop the stage threads."""
+        self._closing = True
+        self._decode_q.put(None)
+
+        deadline = time.monotonic() + timeout
+        while self._daemon.is_alive() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        self._daemon.stop()
+
+    def get_stats(self, reset_max: bool = False) -> dict[str, dict[str, Any]]:
+        """Per stage queue depth, processed items / records and latency (avg / max since last reset)."""
+        depths = {
+            "decode": self._decode_q.qsize(),
+            "append": self._append_q.qsize(),
+            "index": self.writer.pending_rows(),
+        }
+        return {name: st.snapshot(depths[name], reset_max) for name, st in self._stats.items()}
+
+    def _decode_thread(self, stop_flag: daemon.StopFlag) -> None:
+        st = self._stats["decode"]
+        records: list[dict[str, Any] | RawRecord] = []
+        t_first = 0.0
+
+        while stop_flag.run():
+            try:
+                item = self._decode_q.get(timeout=0.25)
+            except queue.Empty:
+                continue
+
+            # Everything already queued is decoded into one append item. Markers split it,
+            # since they take their line from the records written before them.
+            while item is not None:
+                t_put, msg = item
+                recs, marker = decode_message_records(msg)
+
+                if not records:
+                    t_first = t_put
+                records.extend(recs)
+
+                if marker is not None:
+                    if records:
+                        self._append_q.put((t_first, records, None))
+                        st.add(len(records), time.monotonic() - t_first)
+                        records = []
+                    self._append_q.put((t_put, [], marker))
+                    st.add(0, time.monotonic() - t_put)
+
+                try:
+                    item = self._decode_q.get(block=False)
+                except queue.Empty:
+                    break
+
+            if records:
+                self._append_q.put((t_first, records, None))
+                st.add(len(records), time.monotonic() - t_first)
+                records = []
+
+            if item is None:
+                self._append_q.put(None)
+                return
+
+    def _append_thread(self, stop_flag: daemon.StopFlag) -> None:
+        st = self._stats["append"]
+
+        while stop_flag.run():
+            try:
+                item = self._append_q.get(timeout=0.25)
+            except queue.Empty:
+                continue
+
+            if item is None:
+                with self._rows_cond:
+                    self._append_done = True
+                    self._rows_cond.notify()
+                return
+
+            t_put, records, marker = item
+
+            # Back-pressure from the index stage.
+            while self.writer.pending_rows() >= self.max_pending_rows and stop_flag.run():
+                with self._rows_cond:
+                    self._rows_cond.notify()
+                time.sleep(0.001)
+
+            if records:
+                self.writer.append_batch(records)
+            if marker is not None:
+                handle_marker(self.writer, *marker)
+
+            st.add(len(records), time.monotonic() - t_put)
+
+            if self.writer.pending_rows() >= self.writer.commit_max_records:
+                with self._rows_cond:
+                    self._rows_cond.notify()
+
+    def _index_thread(self, stop_flag: daemon.StopFlag) -> None:
+        st = self._stats["index"]
+
+        while stop_flag.run():
+            with self._rows_cond:
+                if not self._append_done and self.writer.pending_rows() < self.writer.commit_max_records:
+                    self._rows_cond.wait(self.writer.commit_interval_s)
+                done = self._append_done
+
+            n = self.writer.pending_rows()
+            if n:
+                t = time.monotonic()
+                self.writer.commit()
+                st.add(n, time.monotonic() - t)
+
+            if done:
+                return
@@ -1,25 +1,163 @@
 from __future__ import annotations
 
 import json
+import re
+import struct
 
-from typing import Any
+from typing import Any, NamedTuple
 
 MAGIC = b"IECS"      # 4 bytes
 TYPE_LOG = 0x01      # 1 byte
 TYPE_EVT_BEGIN = 0x02  # 1 byte
 TYPE_EVT_END = 0x03    # 1 byte
 TYPE_EVT_END_LAST = 0x04  # 1 byte
+TYPE_LOG_BATCH = 0x05  # 1 byte
 PROTO_V1 = 0x01      # 1 byte
+PROTO_V2 = 0x02      # 1 byte, binary log records
 HEADER_LEN = 6       # MAGIC(4) + TYPE(1) + VER(1)
 
+# ----- PROTO_V2 binary record -----
+# uuid(16) ts_ns(i64) seq(u32) level(u8) l_type(u8), then
+#   [u16 len + level]   if level == CODE_LITERAL
+#   [u16 len + l_type]  if l_type == CODE_LITERAL
+#   u32 len + msg
+#   data (JSON object, rest of the record)
+# Common levels / types are interned to one byte; the code tables are append-only.
+V2_HEADER = struct.Struct(">16sqIBB")
+V2_LEVELS = ("DEBUG", "INFO", "WARN", "WARNING", "ERROR", "CRITICAL")
+V2_L_TYPES = ("SW", "SOFTW", "EXP", "REC", "CTRL")
+CODE_LITERAL = 0xFF
+
+_V2_LEVEL_CODES = {v: i for i, v in enumerate(V2_LEVELS)}
+_V2_L_TYPE_CODES = {v: i for i, v in enumerate(V2_L_TYPES)}
+_U16 = struct.Struct(">H")
+_U32 = struct.Struct(">I")
+
 
 class ProtocolError(Exception):
     pass
 
 
+def encode_record_payload(record: dict[str, Any]) -> bytes:
+    return json.dumps(record, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
 def encode_log_record(record: dict[str, Any]) -> bytes:
-    payload = json.dumps(record, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
-    return MAGIC + bytes([TYPE_LOG, PROTO_V1]) + payload
+    return MAGIC + bytes([TYPE_LOG, PROTO_V1]) + encode_record_payload(record)
+
+
+def encode_log_batch(payloads: list[bytes]) -> bytes:
+    """
+    Several log records in one message. payloads are records already encoded with
+    encode_record_payload(); the batch payload is a JSON array of them.
+    """
+    return MAGIC + bytes([TYPE_LOG_BATCH, PROTO_V1]) + b"[" + b",".join(payloads) + b"]"
+
+
+class BinaryRecord(NamedTuple):
+    origin_uuid: bytes
+    ts_ns: int
+    seq: int
+    level: str
+    l_type: str
+    msg: str
+    data_json: bytes
+
+
+def encode_binary_record(
+    *,
+    origin_uuid: bytes,
+    ts_ns: int,
+    seq: int,
+    level: str,
+    l_type: str,
+    msg: str,
+    data: dict[str, Any],
+) -> bytes:
+    level_code = _V2_LEVEL_CODES.get(level, CODE_LITERAL)
+    l_type_code = _V2_L_TYPE_CODES.get(l_type, CODE_LITERAL)
+
+    try:
+        parts = [V2_HEADER.pack(origin_uuid, ts_ns, seq, level_code, l_type_code)]
+
+        for code, literal in ((level_code, level), (l_type_code, l_type)):
+            if code == CODE_LITERAL:
+                b = literal.encode("utf-8")
+                parts.append(_U16.pack(len(b)) + b)
+
+        b_msg = msg.encode("utf-8")
+        parts.append(_U32.pack(len(b_msg)) + b_msg)
+    except struct.error as e:
+        raise ProtocolError(f"record does not fit the binary format: {e}") from e
+
+    parts.append(encode_record_payload(data))
+    return b"".join(parts)
+
+
+def decode_binary_record(payload: bytes) -> BinaryRecord:
+    try:
+        origin_uuid, ts_ns, seq, level_code, l_type_code = V2_HEADER.unpack_from(payload)
+        pos = V2_HEADER.size
+
+        literals = []
+        for code in (level_code, l_type_code):
+            if code == CODE_LITERAL:
+                (n,) = _U16.unpack_from(payload, pos)
+                literals.append(bytes(payload[pos + 2:pos + 2 + n]).decode("utf-8"))
+                pos += 2 + n
+            else:
+                literals.append(None)
+
+        level = literals[0] if literals[0] is not None else V2_LEVELS[level_code]
+        l_type = literals[1] if literals[1] is not None else V2_L_TYPES[l_type_code]
+
+        (n,) = _U32.unpack_from(payload, pos)
+        msg = bytes(payload[pos + 4:pos + 4 + n]).decode("utf-8")
+        pos += 4 + n
+    except (struct.error, IndexError, UnicodeDecodeError) as e:
+        raise ProtocolError(f"bad binary record: {e}") from e
+
+    data_json = bytes(payload[pos:])
+    # data_json is spliced into the NDJSON line verbatim, so it must be one line of valid JSON.
+    if data_json[:1] != b"{" or data_json[-1:] != b"}" or b"\n" in data_json or b"\r" in data_json:
+        raise ProtocolError("bad binary record: data is not a single-line JSON object")
+    try:
+        text = data_json.decode("utf-8")
+        _, end = _JSON_DECODER.raw_decode(text)
+    except ValueError as e:
+        raise ProtocolError(f"bad binary record: data is not valid JSON: {e}") from e
+    if end != len(text):
+        raise ProtocolError("bad binary record: trailing bytes after data")
+
+    return BinaryRecord(origin_uuid, ts_ns, seq, level, l_type, msg, data_json)
+
+
+def encode_log_record_v2(payload: bytes) -> bytes:
+    """payload is a record encoded with encode_binary_record()."""
+    return MAGIC + bytes([TYPE_LOG, PROTO_V2]) + payload
+
+
+def encode_log_batch_v2(payloads: list[bytes]) -> bytes:
+    """Binary records, each prefixed with its u32 length."""
+    return MAGIC + bytes([TYPE_LOG_BATCH, PROTO_V2]) + b"".join(_U32.pack(len(p)) + p for p in payloads)
+
+
+def decode_log_batch_v2(payload: bytes) -> list[BinaryRecord]:
+    records = []
+    pos = 0
+    while pos < len(payload):
+        try:
+            (n,) = _U32.unpack_from(payload, pos)
+        except struct.error as e:
+            raise ProtocolError(f"bad binary batch: {e}") from e
+
+        if pos + 4 + n > len(payload):
+            raise ProtocolError("bad binary batch: truncated record")
+
+        records.append(decode_binary_record(payload[pos + 4:pos + 4 + n]))
+        pos += 4 + n
+
+    return records
 
 
 def decode_message(msg: bytes) -> tuple[int, int, bytes]:
@@ -32,9 +170,92 @@ def decode_message(msg: bytes) -> tuple[int, int, bytes]:
     return msg_type, ver, msg[6:]
 
 
+# Schema v1 record exactly as LogClient renders it (key order, compact separators) up to "data".
+# Strings are valid JSON strings: no control characters, only the escapes JSON defines.
+_V1_RECORD_HEAD = re.compile(
+    r'\{"v":1,"origin":\{"uuid":"([^"\\\x00-\x1f]*)","ts_ns":(-?\d+)\},"seq":-?\d+,'
+    r'"level":"([^"\\\x00-\x1f]*)","msg":"[^"\\\x00-\x1f]*(?:\\(?:["\\/bfnrt]|u[0-9a-fA-F]{4})[^"\\\x00-\x1f]*)*",'
+    r'"l_type":"([^"\\\x00-\x1f]*)","data":'
+)
+_JSON_DECODER = json.JSONDecoder()
+
+
+class ScannedRecord(NamedTuple):
+    body: bytes  # original record text without its closing brace
+    uuid: str
+    ts_ns: int
+    level: str
+    l_type: str
+    subsystem: str | None  # data["subsystem"]
+
+
+def scan_log_records(payload: bytes, *, batch: bool) -> list[ScannedRecord] | None:
+    """
+    Fast path for PROTO_V1 TYPE_LOG / TYPE_LOG_BATCH payloads produced by LogClient: extracts the
+    indexed fields with a regex and only parses "data" (to find where it ends). Returns None if the
+    payload deviates from that layout in any way (e.g. extra top-level keys); callers then fall
+    back to decode_log_record / decode_log_batch.
+    """
+    # The body is written verbatim, a line break (even as JSON whitespace) would split the NDJSON line.
+    if b"\n" in payload or b"\r" in payload:
+        return None
+
+    try:
+        text = payload.decode("utf-8")
+    except UnicodeDecodeError:
+        return None
+
+    # Character offsets are byte offsets for ASCII payloads, so the body can be sliced directly.
+    ascii_only = len(text) == len(payload)
+
+    pos = 0
+    end_pos = len(text)
+    if batch:
+        if not (text.startswith("[") and text.endswith("]")):
+            return None
+        pos = 1
+        end_pos -= 1
+        if pos == end_pos:
+            return []
+
+    out = []
+    while True:
+        m = _V1_RECORD_HEAD.match(text, pos)
+        if m is None:
+            return None
+
+        try:
+            data, end = _JSON_DECODER.raw_decode(text, m.end())
+        except ValueError:
+            return None
+
+        if end >= end_pos or text[end] != "}":
+            return None
+
+        body = payload[pos:end] if ascii_only else text[pos:end].encode("utf-8")
+        subsystem = data.get("subsystem") if isinstance(data, dict) else None
+        if not (isinstance(subsystem, str) and subsystem):
+            subsystem = None
+        out.append(ScannedRecord(body, m.group(1), int(m.group(2)), m.group(3), m.group(4), subsystem))
+
+        pos = end + 1
+        if pos == end_pos:
+            return out
+        if not batch or text[pos] != ",":
+            return None
+        pos += 1
+
+
 def decode_log_record(payload: bytes) -> dict[str, Any]:
     return json.loads(payload.decode("utf-8"))
 
+
+def decode_log_batch(payload: bytes) -> list[dict[str, Any]]:
+    records = json.loads(payload.decode("utf-8"))
+    if not isinstance(records, list):
+        raise ProtocolError("log batch payload is not a list")
+    return records
+
 def _encode_json_payload(obj: dict[str, Any]) -> bytes:
     return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
 
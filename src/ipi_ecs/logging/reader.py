@@ -1,11 +1,12 @@
 from __future__ import annotations
 
-import json
 from pathlib import Path
 from typing import Any
 
+from ipi_ecs.logging.db_reader import DBJournalReader
 from ipi_ecs.logging.index import SQLiteIndex
 from ipi_ecs.logging.journal import SegmentInfo
+from ipi_ecs.logging.line_index import sidecar_path
 
 
 class JournalReader:
@@ -47,7 +48,7 @@ class JournalReader:
                     end_line=(int(end_line) if end_line is not None else None),
                     start_ts_ns=int(start_ts_ns),
                     end_ts_ns=(int(end_ts_ns) if end_ts_ns is not None else None),
-                    idx_path=None,  # idx files are optional; SQLite already stores byte offsets
+                    idx_path=str(sidecar_path(Path(path))),  # line -> offset sidecar, see line_index.py
                 )
             )
         self.segments = segs
@@ -64,30 +65,15 @@ class JournalReader:
         if end_linenum <= start_linenum:
             return []
 
-        rows = self.index.query_lines(
-            line_min=int(start_linenum),
-            line_max=int(end_linenum),
-            order_by="line",
-            descending=False,
-            limit=None,
-        )
-
-        out: list[dict[str, Any]] = []
-        handles: dict[str, Any] = {}
+        # DBJournalReader also covers the shard indexes of archives written by a sharded logger.
+        rdr = DBJournalReader(self.root)
         try:
-            for _line, seg, off, ts_ns, level, level_num, uuid, l_type in rows:
-                f = handles.get(seg)
-                if f is None:
-                    f = (self.root / seg).open("rb")
-                    handles[seg] = f
-                f.seek(off)
-                raw = f.readline()
-                out.append((_line, json.loads(raw.decode("utf-8"))))
+            return rdr.query(
+                line_min=int(start_linenum),
+                line_max=int(end_linenum),
+                order_by="line",
+                descending=False,
+                limit=None,
+            )
         finally:
-            for f in handles.values():
-                try:
-                    f.close()
-                except Exception:
-                    pass
-        
-        return out
+            rdr.close()
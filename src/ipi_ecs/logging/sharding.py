@@ -0,0 +1,217 @@
+# src/ipi_ecs/logging/sharding.py
+from __future__ import annotations
+
+import multiprocessing as mp
+import queue
+import socket
+import threading
+import traceback
+from pathlib import Path
+from typing import Any
+
+import mt_events
+
+from ipi_ecs.core import tcp
+from ipi_ecs.core.daemon import StopFlag
+from ipi_ecs.logging.index import SHARDS_DIR, SQLiteIndex, archive_index_dirs
+from ipi_ecs.logging.journal import JournalWriter
+
+# How often the parent checks its stop flag and publishes next_line to the top-level index.
+ACCEPT_TIMEOUT_S = 0.25
+
+
+class LineAllocator:
+    """
+    Global line number counter shared between the shard processes.
+
+    Every append_batch() of a shard leases one contiguous block, so line numbers are unique
+    across the archive and increase in the order the batches were ingested.
+    """
+
+    def __init__(self, start: int):
+        self.__counter = mp.Value("q", int(start))
+
+    def allocate(self, n: int) -> int:
+        """Reserve n line numbers and return the first one."""
+        with self.__counter.get_lock():
+            first = self.__counter.value
+            self.__counter.value = first + int(n)
+            return first
+
+    def peek(self) -> int:
+        """Return the next line number that will be handed out."""
+        return self.__counter.value
+
+
+def shard_dir(archive_dir: Path, shard_id: int) -> Path:
+    return archive_dir / SHARDS_DIR / f"{shard_id:02d}"
+
+
+def _start_line(archive_dir: Path) -> int:
+    """Continue after the highest line number any index of the archive has handed out."""
+    start = 0
+    for d in archive_index_dirs(archive_dir):
+        idx = SQLiteIndex(d / "index.sqlite3")
+        try:
+            start = max(start, idx.get_next_line())
+        finally:
+            idx.close()
+    return start
+
+
+def _receive_thread(conn: Any, client_q: queue.Queue, on_connected: mt_events.Event, stop_event: Any) -> None:
+    """Turn sockets handed over by the parent into client handlers, like TCPServer does."""
+    handlers = []
+    try:
+        while not stop_event.is_set():
+            if not conn.poll(ACCEPT_TIMEOUT_S):
+                continue
+
+            sock, addr = conn.recv()
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, True)
+
+            handler = tcp.TCPServerSocket(sock, addr)
+            handlers.append(handler)
+            client_q.put(handler)
+            on_connected.call()
+
+            handler.start()
+    except (EOFError, OSError):
+        pass
+    finally:
+        for handler in handlers:
+            handler.shutdown()
+
+
+def _shard_worker(
+    shard_id: int,
+    archive_dir: Path,
+    conn: Any,
+    allocator: LineAllocator,
+    stop_event: Any,
+    writer_opts: dict[str, Any],
+    pipelined: bool,
+    stats_interval_s: float,
+) -> None:
+    from ipi_ecs.logging.logger_server import _serve
+
+    client_q: queue.Queue = queue.Queue()
+    on_connected = mt_events.Event()
+
+    writer = JournalWriter(
+        shard_dir(archive_dir, shard_id),
+        service_name=f"logger-shard-{shard_id:02d}",
+        auto_commit=not pipelined,
+        line_allocator=allocator,
+        event_index_path=archive_dir / "index.sqlite3",
+        **writer_opts,
+    )
+
+    receiver = threading.Thread(
+        target=_receive_thread, args=(conn, client_q, on_connected, stop_event), daemon=True
+    )
+    receiver.start()
+
+    try:
+        _serve(
+            client_q,
+            on_connected,
+            writer,
+            lambda: not stop_event.is_set(),
+            pipelined=pipelined,
+            stats_interval_s=stats_interval_s,
+        )
+    except KeyboardInterrupt:
+        pass
+    except Exception:
+        print(f"Logger shard {shard_id} exception:\n", traceback.format_exc())
+        raise
+    finally:
+        stop_event.set()
+        receiver.join()
+        writer.close()
+
+
+def run_sharded_server(
+    bind: tuple[str, int],
+    archive_dir: Path,
+    shards: int,
+    *,
+    stop_flag: StopFlag | None = None,
+    writer_opts: dict[str, Any] | None = None,
+    pipelined: bool = True,
+    stats_interval_s: float = 60.0,
+) -> None:
+    """
+    Accept log client connections and hand them round-robin to shard worker processes.
+
+    Each shard writes its own sub-journal under <archive>/shards/NN. Line numbers come from a
+    LineAllocator shared by all shards; events and the archive's next_line are kept in the
+    top-level index, so DBJournalReader / ArchiveView read the archive as one journal.
+    """
+    archive_dir = Path(archive_dir)
+    archive_dir.mkdir(parents=True, exist_ok=True)
+
+    top = SQLiteIndex(archive_dir / "index.sqlite3")
+    allocator = LineAllocator(_start_line(archive_dir))
+    top.set_next_line(allocator.peek())
+
+    stop_event = mp.Event()
+    workers = []
+    pipes = []
+    for i in range(shards):
+        recv_conn, send_conn = mp.Pipe(duplex=False)
+        p = mp.Process(
+            target=_shard_worker,
+            args=(i, archive_dir, recv_conn, allocator, stop_event, writer_opts or {}, pipelined, stats_interval_s),
+            name=f"logger-shard-{i:02d}",
+            daemon=True,
+        )
+        p.start()
+        workers.append(p)
+        pipes.append(send_conn)
+
+    srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, True)
+    srv.bind(bind)
+    srv.listen()
+    srv.settimeout(ACCEPT_TIMEOUT_S)
+
+    next_shard = 0
+    published = allocator.peek()
+
+    try:
+        while not stop_event.is_set() and not (stop_flag is not None and not stop_flag.run()):
+            if not all(p.is_alive() for p in workers):
+                print("Logger shard exited, stopping.")
+                break
+
+            try:
+                c_socket, addr = srv.accept()
+            except socket.timeout:
+                c_socket = None
+
+            if c_socket is not None:
+                # Connection.send() pickles right away, so the parent's copy can be closed after it.
+                c_socket.settimeout(None)
+                pipes[next_shard].send((c_socket, addr))
+                c_socket.close()
+                next_shard = (next_shard + 1) % shards
+
+            line = allocator.peek()
+            if line != published:
+                top.set_next_line(line)
+                published = line
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print("Closing logger shards...")
+        srv.close()
+        stop_event.set()
+        for p in workers:
+            p.join()
+        for c in pipes:
+            c.close()
+
+        top.set_next_line(allocator.peek())
+        top.close()
@@ -1,6 +1,7 @@
 # src/ipi_ecs/logging/viewer.py
 from __future__ import annotations
 
+import re
 import shutil
 import sqlite3
 import time
@@ -10,12 +11,47 @@ from pathlib import Path
 from typing import Any, Iterable, Iterator, Optional
 
 from ipi_ecs.logging.db_reader import DBJournalReader
-from ipi_ecs.logging.index import DEFAULT_LEVEL_MAP, SQLiteIndex
+from ipi_ecs.logging.index import DEFAULT_LEVEL_MAP, NS_PER_MINUTE, SQLiteIndex, archive_index_dirs
 from ipi_ecs.logging.journal import resolve_log_dir
 from ipi_ecs.logging.timefmt import parse_time_to_ns, fmt_ns_local
 
 ENV_LOG_DIR_DEFAULT = "IPI_ECS_LOG_DIR"
 
+_FIELD_FILTER = re.compile(r"^\s*([^\s<>=]+)\s*(<=|>=|=|<|>)\s*(.*?)\s*$")
+
+_BUCKET = re.compile(r"^\s*(\d+)\s*([smhd]?)\s*$")
+_BUCKET_UNIT_S = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}
+_LEVEL_NAMES = {num: name for name, num in DEFAULT_LEVEL_MAP.items() if name != "WARNING"}
+
+
+def parse_bucket(bucket: int | str) -> int:
+    """Histogram bucket width ("5m", "1h", "1d" or seconds) in minutes, the rollup resolution."""
+    m = _BUCKET.match(str(bucket))
+    seconds = int(m.group(1)) * _BUCKET_UNIT_S[m.group(2)] if m else 0
+    if seconds <= 0 or seconds % 60:
+        raise ValueError(f"Invalid histogram bucket: {bucket!r} (whole minutes, e.g. 1m, 15m, 1h, 1d)")
+    return seconds // 60
+
+
+def parse_field_filter(expr: str) -> tuple[str, str, Any]:
+    """
+    "data.shot=1234" / "data.shot>=1000" / 'data.run="42"' -> (path, op, value).
+    Values are numbers if they parse as one, quote a value to compare it as a string.
+    """
+    m = _FIELD_FILTER.match(expr)
+    if m is None:
+        raise ValueError(f"Invalid field filter: {expr!r} (expected path=value, path<value, ...)")
+    path, op, raw = m.groups()
+
+    if len(raw) >= 2 and raw[0] == raw[-1] and raw[0] in "\"'":
+        return path, op, raw[1:-1]
+    for conv in (int, float):
+        try:
+            return path, op, conv(raw)
+        except ValueError:
+            pass
+    return path, op, raw
+
 
 @dataclass(frozen=True)
 class LogLine:
@@ -23,6 +59,13 @@ class LogLine:
     record: dict[str, Any]
 
 
+@dataclass(frozen=True)
+class HistogramBin:
+    start_ns: int
+    key: dict[str, Any]     # group column -> value, e.g. {"level": "ERROR", "subsystem": "pump"}
+    count: int
+
+
 @dataclass(frozen=True)
 class ArchiveInfo:
     name: str
@@ -52,6 +95,9 @@ class EventInfo:
 class QueryOptions:
     # filters
     uuid: str | None = None
+    subsystem: str | None = None
+    text: str | None = None
+    fields: list[str] | None = None            # "data.shot=1234", "data.shot<2000", ...
     line_from: int | None = None                # inclusive
     line_to: int | None = None                  # inclusive
     since: str | None = None                    # human string
@@ -82,6 +128,9 @@ class QueryOptions:
             line_min=self.line_from,
             line_max=line_max,
             uuid=self.uuid,
+            subsystem=self.subsystem,
+            text=self.text,
+            field_filters=[parse_field_filter(f) for f in self.fields or ()],
             ts_min_ns=ts_min,
             ts_max_ns=ts_max,
             l_type=self.l_type,
@@ -174,12 +223,38 @@ class ArchiveView:
         self.reader.close()
 
     def next_line(self) -> int:
-        return self.reader.index.get_next_line()
+        return self.reader.get_next_line()
 
     def query(self, opts: QueryOptions) -> list[LogLine]:
         rows = self.reader.query(**opts.to_db_kwargs())
         return [LogLine(line, rec) for line, rec in rows]
 
+    def histogram(self, opts: QueryOptions, *, bucket: int | str = "1m", by: Iterable[str] = ("level",)) -> list[HistogramBin]:
+        """
+        Record counts per time bucket (and per value of the by columns: level, l_type, uuid,
+        subsystem), answered from the index's per-minute rollups. Only filters kept in the rollups
+        apply; since / until are widened to whole minutes. Buckets are aligned to the epoch (UTC).
+        """
+        unsupported = [name for name in ("line_from", "line_to", "text", "fields") if getattr(opts, name)]
+        if unsupported:
+            raise ValueError(f"Histograms cannot filter by {', '.join(unsupported)}")
+
+        by = list(by)
+        kw = opts.to_db_kwargs()
+        rows = self.reader.histogram(
+            bucket_minutes=parse_bucket(bucket),
+            by=by,
+            **{k: kw[k] for k in ("ts_min_ns", "ts_max_ns", "uuid", "subsystem", "l_type", "l_type_not", "level", "min_level_num")},
+        )
+
+        out = []
+        for minute, values, n in rows:
+            key = dict(zip(by, values))
+            if "level" in key:
+                key["level"] = _LEVEL_NAMES.get(key["level"], str(key["level"]))
+            out.append(HistogramBin(minute * NS_PER_MINUTE, key, n))
+        return out
+
     def follow(
         self,
         opts: QueryOptions,
@@ -206,7 +281,7 @@ class ArchiveView:
             q["line_min"] = pos
             q["limit"] = batch
             q["order_by"] = "line"
-            q["desc"] = False
+            q["descending"] = False
 
             rows = self.reader.query(**q)
             if rows:
@@ -401,20 +476,30 @@ class LogViewer:
         if not db.exists():
             return ArchiveInfo(name, archive_dir, 0, 0, 0, 0)
 
-        conn = sqlite3.connect(str(db))
-        try:
-            srow = conn.execute(
-                "SELECT MIN(start_ts_ns), MAX(COALESCE(end_ts_ns, start_ts_ns)) FROM segments"
-            ).fetchone()
-            start_ts_ns = int(srow[0] or 0)
-            end_ts_ns = int(srow[1] or 0)
-
-            lrow = conn.execute("SELECT MIN(start_line) FROM segments").fetchone()
-            start_line = int(lrow[0] or 0)
-        finally:
-            conn.close()
-
-        end_line = self._read_next_line_from_index(db)
+        starts_ts: list[int] = []
+        ends_ts: list[int] = []
+        start_lines: list[int] = []
+        end_line = 0
+
+        # Sharded archives keep their segments in the shard indexes.
+        for d in archive_index_dirs(archive_dir):
+            conn = sqlite3.connect(str(d / "index.sqlite3"))
+            try:
+                srow = conn.execute(
+                    "SELECT MIN(start_ts_ns), MAX(COALESCE(end_ts_ns, start_ts_ns)), MIN(start_line) FROM segments"
+                ).fetchone()
+            finally:
+                conn.close()
+
+            if srow[0] is not None:
+                starts_ts.append(int(srow[0]))
+                ends_ts.append(int(srow[1] or 0))
+                start_lines.append(int(srow[2] or 0))
+            end_line = max(end_line, self._read_next_line_from_index(d / "index.sqlite3"))
+
+        start_ts_ns = min(starts_ts) if starts_ts else 0
+        end_ts_ns = max(ends_ts) if ends_ts else 0
+        start_line = min(start_lines) if start_lines else 0
         return ArchiveInfo(name, archive_dir, start_line, end_line, start_ts_ns, end_ts_ns)
 
     def list_archives(self, *, since: str | None = None, until: str | None = None) -> list[ArchiveInfo]:
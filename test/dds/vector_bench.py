@@ -0,0 +1,29 @@
+import time
+import random
+
+import ipi_ecs.dds.types as types
+
+N = 1024
+ROUNDS = 2000
+
+def bench(name, spec, values):
+    t0 = time.perf_counter()
+    for _ in range(ROUNDS):
+        data = spec.encode(values)
+    t_enc = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for _ in range(ROUNDS):
+        spec.parse(data)
+    t_dec = time.perf_counter() - t0
+
+    mb = len(data) * ROUNDS / 1e6
+    print(f"{name:<16} {len(data):>6} B  encode {ROUNDS / t_enc:>9.0f} vec/s ({mb / t_enc:7.1f} MB/s)  parse {ROUNDS / t_dec:>9.0f} vec/s ({mb / t_dec:7.1f} MB/s)")
+
+floats = [random.uniform(-1e3, 1e3) for _ in range(N)]
+ints = [random.randint(-2**40, 2**40) for _ in range(N)]
+
+bench("vector float", types.VectorTypeSpecifier(types.FloatTypeSpecifier(), N), floats)
+bench("packed float", types.PackedVectorTypeSpecifier(types.FloatTypeSpecifier(), N), floats)
+bench("vector int", types.VectorTypeSpecifier(types.IntegerTypeSpecifier(), N), ints)
+bench("packed int", types.PackedVectorTypeSpecifier(types.IntegerTypeSpecifier(), N), ints)
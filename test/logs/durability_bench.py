@@ -0,0 +1,47 @@
+import sys
+import time
+import shutil
+import tempfile
+from pathlib import Path
+
+from ipi_ecs.logging.journal import JournalWriter, DURABILITY_MODES
+from ipi_ecs.logging.protocol import encode_record_payload, scan_log_records
+from ipi_ecs.logging.journal import RawRecord
+
+# Usage: durability_bench.py [dir on the disk to test] [batch size]
+BASE = Path(sys.argv[1]) if len(sys.argv) > 1 else None
+BATCH = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+SECONDS = 3.0
+
+
+def record(i):
+    return {
+        "v": 1,
+        "origin": {"uuid": "6c1f0e0e-0000-4000-8000-000000000000", "ts_ns": time.time_ns()},
+        "seq": i,
+        "level": "INFO",
+        "msg": f"reading {i} ok",
+        "l_type": "SW",
+        "data": {"subsystem": "bench", "x": i * 0.5},
+    }
+
+
+payload = b"[" + b",".join(encode_record_payload(record(i)) for i in range(BATCH)) + b"]"
+batch = [RawRecord(*r) for r in scan_log_records(payload, batch=True)]
+
+for mode in DURABILITY_MODES:
+    d = Path(tempfile.mkdtemp(dir=BASE))
+    try:
+        w = JournalWriter(d, durability=mode)
+
+        n = 0
+        t0 = time.perf_counter()
+        while time.perf_counter() - t0 < SECONDS:
+            w.append_batch(batch)
+            n += len(batch)
+        w.close()
+
+        dt = time.perf_counter() - t0
+        print(f"{mode:<7} batch {BATCH:>5}  {n / dt:>9.0f} records/s")
+    finally:
+        shutil.rmtree(d, ignore_errors=True)
@@ -0,0 +1,51 @@
+import json
+import random
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import ipi_ecs.core.tcp as tcp
+from ipi_ecs.core.daemon import StopFlag
+from ipi_ecs.logging.client import LogClient
+from ipi_ecs.logging.logger_server import run_logger_server
+
+# An idle logger must not keep writing "Ingest pipeline stats" records: one record is sent,
+# then the server idles for several stats intervals.
+# Usage: idle_stats.py
+
+STATS_INTERVAL_S = 0.5
+
+d = Path(tempfile.mkdtemp()) / "current"
+port = random.randint(20000, 40000)
+stop = StopFlag()
+server = threading.Thread(
+    target=run_logger_server,
+    args=(("127.0.0.1", port), d),
+    kwargs=dict(stop_flag=stop, stats_interval_s=STATS_INTERVAL_S),
+    daemon=True,
+)
+server.start()
+time.sleep(0.5)
+
+sock = tcp.TCPClientSocket()
+sock.connect(("127.0.0.1", port))
+sock.start()
+time.sleep(0.2)
+
+c = LogClient(sock)
+c.log("one", level="INFO")
+c.close()
+
+time.sleep(12 * STATS_INTERVAL_S)
+stop.stop()
+server.join(10)
+
+records = [json.loads(line) for seg in sorted(d.glob("*.ndjson")) for line in seg.read_text().splitlines()]
+stats = [r for r in records if r.get("msg") == "Ingest pipeline stats"]
+msgs = [r.get("msg") for r in records]
+
+# The record that arrived is reported once, the idle intervals after it are not.
+ok = "one" in msgs and len(stats) <= 1
+print(f"{'ok  ' if ok else 'FAIL'} {len(records)} records, {len(stats)} stats record(s): {msgs}")
+raise SystemExit(0 if ok else 1)
@@ -0,0 +1,58 @@
+import tempfile
+from pathlib import Path
+
+from ipi_ecs.logging.index import SQLiteIndex
+from ipi_ecs.logging.journal import JournalWriter
+
+# Pins the records index query_lines() picks for common filter combinations.
+# Usage: query_plan.py
+
+d = Path(tempfile.mkdtemp())
+w = JournalWriter(d, full_text=True, index_fields=["data.n"])
+w.append_batch([
+    {
+        "v": 1,
+        "origin": {"uuid": f"uuid-{i % 5}", "ts_ns": i},
+        "level": ["INFO", "DEBUG", "ERROR"][i % 3],
+        "msg": f"m{i}",
+        "l_type": ["REC", "SW"][i % 2],
+        "data": {"subsystem": f"sub-{i % 4}", "n": i},
+    }
+    for i in range(2000)
+])
+w.close()
+
+idx = SQLiteIndex(d / "index.sqlite3")
+
+# (query_lines kwargs, expected plan of the records table, temp b-tree for ORDER BY expected)
+CASES = {
+    "uuid + line range": (dict(uuid="uuid-1", line_min=10, line_max=500), "SEARCH r USING INDEX idx_records_uuid_line (uuid_id=? AND line>? AND line<?)", False),
+    "subsystem + line range": (dict(subsystem="sub-2", line_min=10), "SEARCH r USING INDEX idx_records_subsystem_line (subsystem_id=? AND line>?)", False),
+    "text + uuid": (dict(text="m12", uuid="uuid-2"), "SEARCH r USING INTEGER PRIMARY KEY (rowid=?)", False),
+    "field range": (dict(field_filters=[("data.n", ">=", 1990)]), "SEARCH r USING INTEGER PRIMARY KEY (rowid=?)", False),
+    "l_type + line range": (dict(l_type="SW", line_min=5, limit=10), "SEARCH r USING INDEX idx_records_ltype_line (l_type_id=? AND line>?)", False),
+    "window_before": (dict(l_type_not=["REC"], line_max=1000, descending=True, limit=50), "SEARCH r USING INTEGER PRIMARY KEY (rowid<?)", False),
+    "time range by time": (dict(ts_min_ns=10, ts_max_ns=900, order_by="ts_ns"), "SEARCH r USING INDEX idx_records_ts_line (ts_ns>? AND ts_ns<?)", False),
+    "min level + time": (dict(min_level="ERROR", ts_min_ns=10, ts_max_ns=900), "SEARCH r USING INDEX idx_records_ts_line (ts_ns>? AND ts_ns<?)", True),
+    "min level": (dict(min_level="ERROR", limit=10), "SEARCH r USING INDEX idx_records_levelnum_line (level_num>?)", True),
+    "min level (not selective)": (dict(min_level="INFO", limit=10), "SCAN r", False),
+    "order by level": (dict(order_by="level_num", descending=True, limit=10), "SCAN r USING INDEX idx_records_levelnum_line", False),
+    "no filter": (dict(limit=10), "SCAN r", False),
+}
+
+failed = 0
+for name, (kwargs, expected, temp_sort) in CASES.items():
+    plan = idx.explain_query_lines(**kwargs)
+    ok = plan[0] == expected and ("USE TEMP B-TREE FOR ORDER BY" in plan) == temp_sort
+    # The plan must not change the result.
+    ok = ok and len(idx.query_lines(**kwargs)) > 0
+    failed += not ok
+
+    print(f"{'ok  ' if ok else 'FAIL'} {name}: {plan[0]}")
+    if not ok:
+        print("     expected:", expected, "(temp sort)" if temp_sort else "")
+        print("     plan:", plan)
+
+idx.close()
+print(f"{len(CASES) - failed}/{len(CASES)} plans as expected")
+raise SystemExit(1 if failed else 0)
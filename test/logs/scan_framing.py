@@ -0,0 +1,59 @@
+import json
+import tempfile
+from pathlib import Path
+
+from ipi_ecs.logging.journal import JournalWriter, RawRecord
+from ipi_ecs.logging.pipeline import decode_message_records
+from ipi_ecs.logging.protocol import MAGIC, PROTO_V1, TYPE_LOG, TYPE_LOG_BATCH
+
+# V1 payloads that the scan_log_records() fast path must leave to the JSON decoder: written
+# verbatim they would split an NDJSON line or leave an unparseable one.
+# Usage: scan_framing.py
+
+HEAD = '{"v":1,"origin":{"uuid":"u","ts_ns":1},"seq":1,"level":"INFO","msg":'
+TAIL = ',"l_type":"SW","data":'
+
+# (name, msg as JSON text, data as JSON text, fast path expected)
+CASES = [
+    ("plain", '"x"', '{"k":1}', True),
+    ("escapes", '"a\\"b\\\\c\\n\\u00e9/"', '{"k":"\\t"}', True),
+    ("raw LF in msg", '"x\ny"', '{"k":1}', False),
+    ("raw CR in msg", '"x\ry"', '{"k":1}', False),
+    ("raw tab in msg", '"x\ty"', '{"k":1}', False),
+    ("invalid escape in msg", '"x\\qy"', '{"k":1}', False),
+    ("LF in data whitespace", '"x"', '{"k":\n1}', False),
+    ("CR in data whitespace", '"x"', '{"k":\r1}', False),
+]
+
+failed = 0
+d = Path(tempfile.mkdtemp())
+w = JournalWriter(d)
+n_written = 0
+
+for name, msg, data, fast in CASES:
+    payload = (HEAD + msg + TAIL + data + "}").encode("utf-8")
+    for msg_type, body in ((TYPE_LOG, payload), (TYPE_LOG_BATCH, b"[" + payload + b"," + payload + b"]")):
+        records, marker = decode_message_records(MAGIC + bytes([msg_type, PROTO_V1]) + body)
+        raw = [isinstance(r, RawRecord) for r in records]
+        ok = marker is None and all(r == fast for r in raw)
+        failed += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {name} ({'batch' if msg_type == TYPE_LOG_BATCH else 'single'}): fast path {raw}")
+
+        w.append_batch(records)
+        n_written += len(records)
+
+w.close()
+
+# Every record must still be exactly one parseable line.
+lines = [line for seg in sorted(d.glob("*.ndjson")) for line in seg.read_bytes().split(b"\n") if line]
+try:
+    for line in lines:
+        json.loads(line)
+    ok = len(lines) == n_written
+except ValueError as e:
+    ok = False
+    print(e)
+failed += not ok
+print(f"{'ok  ' if ok else 'FAIL'} {len(lines)} lines for {n_written} records")
+
+raise SystemExit(1 if failed else 0)